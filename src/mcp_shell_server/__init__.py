@@ -7,10 +7,22 @@ __all__ = ["__version__", "main", "server"]
 
 
 def main():
-    """Main entry point for the package."""
+    """Main entry point for the package.
+
+    Uses uvloop's event loop for subprocess and pipe I/O when it is installed
+    (``pip install mcp-shell-server[uvloop]``), otherwise the default asyncio
+    loop.
+    """
     import asyncio
 
-    asyncio.run(server.main())
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(server.main())
+        return
+
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+        runner.run(server.main())
 
 
 if __name__ == "__main__":
@@ -1,6 +1,29 @@
+import itertools
+import re
 import shlex
+from dataclasses import dataclass
 from typing import Dict, List, Tuple, Union
 
+from mcp_shell_server.command_validator import SHELL_OPERATORS
+from mcp_shell_server.io_redirection_handler import (
+    OUTPUT_REDIRECTION_OPERATORS,
+    REDIRECTION_OPERATORS,
+)
+
+# Arguments made only of these characters need no shell quoting at all.
+SAFE_SHELL_ARG_PATTERN = re.compile(r"\A[A-Za-z0-9@%+=:,./_-]+\Z")
+
+
+@dataclass(slots=True)
+class CleanedCommand:
+    """
+    Cleaned argv tokens together with the syntax facts found while cleaning.
+    """
+
+    tokens: List[str]
+    has_pipe: bool = False
+    has_redirect: bool = False
+
 
 class CommandPreProcessor:
     """
@@ -19,21 +42,32 @@ class CommandPreProcessor:
         pipe smuggle an extra allowlisted pipeline stage past command-specific
         argument policies (GHSA-q8pm-q3r2-q7cg, GHSA-7wg7-jj87-qp4c). Clients
         MUST express pipelines with a discrete "|" element.
+
+        Since no token is ever rewritten, a list argument is returned as-is
+        rather than copied; clean_command builds the fresh token list.
         """
-        return list(command)
+        return command if isinstance(command, list) else list(command)
 
-    def clean_command(self, command: List[str]) -> List[str]:
+    def clean_command(self, command: List[str]) -> CleanedCommand:
         """
         Clean command by trimming whitespace from each part.
         Removes empty strings but preserves arguments that are meant to be spaces.
+        Pipe and redirection operators are recorded in the same pass so callers
+        do not need to re-scan the tokens.
 
         Args:
             command (List[str]): Original command and its arguments
 
         Returns:
-            List[str]: Cleaned command
+            CleanedCommand: Cleaned tokens and the operators they contain
         """
-        return [arg for arg in command if arg]  # Remove empty strings
+        # Empty strings are rare, so reuse the list unless one must be removed.
+        tokens = command if all(command) else [arg for arg in command if arg]
+        return CleanedCommand(
+            tokens=tokens,
+            has_pipe="|" in tokens,
+            has_redirect=not REDIRECTION_OPERATORS.isdisjoint(tokens),
+        )
 
     def create_shell_command(self, command: List[str]) -> str:
         """
@@ -43,16 +77,10 @@ class CommandPreProcessor:
         if not command:
             return ""
 
-        escaped_args = []
-        for arg in command:
-            if arg.isspace():
-                # Wrap space-only arguments in single quotes
-                escaped_args.append(f"'{arg}'")
-            else:
-                # Properly escape all arguments including those with wildcards
-                escaped_args.append(shlex.quote(arg.strip()))
-
-        return " ".join(escaped_args)
+        return " ".join(
+            arg if SAFE_SHELL_ARG_PATTERN.match(arg) else shlex.quote(arg)
+            for arg in command
+        )
 
     def split_pipe_commands(self, command: List[str]) -> List[List[str]]:
         """
@@ -64,27 +92,23 @@ class CommandPreProcessor:
         Returns:
             List[List[str]]: List of commands split by pipe operator
         """
-        commands: List[List[str]] = []
-        current_command: List[str] = []
-
-        for arg in command:
-            if arg == "|":
-                if current_command:
-                    commands.append(current_command)
-                    current_command = []
-            else:
-                current_command.append(arg)
-
-        if current_command:
-            commands.append(current_command)
-
-        return commands
+        # Runs of "|" become one separator group; empty segments never appear.
+        return [
+            list(group)
+            for is_pipe, group in itertools.groupby(command, key=lambda arg: arg == "|")
+            if not is_pipe
+        ]
 
     def parse_command(
         self, command: List[str]
     ) -> Tuple[List[str], Dict[str, Union[None, str, bool]]]:
         """
-        Parse command and extract redirections.
+        Parse command and extract redirections in a single pass.
+
+        Operator-target errors are raised as they are found. An input
+        redirection followed directly by another operator is reported as a
+        consecutive-operator error once the rest of the command has parsed,
+        matching the IORedirectionHandler syntax check.
         """
         cmd = []
         redirects: Dict[str, Union[None, str, bool]] = {
@@ -92,23 +116,23 @@ class CommandPreProcessor:
             "stdout": None,
             "stdout_append": False,
         }
+        deferred_error = None
 
         i = 0
         while i < len(command):
             token = command[i]
 
             # Shell operators check
-            if token in ["|", ";", "&&", "||"]:
+            if token in SHELL_OPERATORS:
                 raise ValueError(f"Unexpected shell operator: {token}")
 
             # Output redirection
-            if token in [">", ">>"]:
+            if token in OUTPUT_REDIRECTION_OPERATORS:
                 if i + 1 >= len(command):
                     raise ValueError("Missing path for output redirection")
-                if i + 1 < len(command) and command[i + 1] in [">", ">>", "<"]:
+                if command[i + 1] in REDIRECTION_OPERATORS:
                     raise ValueError("Invalid redirection target: operator found")
-                path = command[i + 1]
-                redirects["stdout"] = path
+                redirects["stdout"] = command[i + 1]
                 redirects["stdout_append"] = token == ">>"
                 i += 2
                 continue
@@ -118,6 +142,8 @@ class CommandPreProcessor:
                 if i + 1 >= len(command):
                     raise ValueError("Missing path for input redirection")
                 path = command[i + 1]
+                if path in REDIRECTION_OPERATORS and deferred_error is None:
+                    deferred_error = "Invalid redirection syntax: consecutive operators"
                 redirects["stdin"] = path
                 i += 2
                 continue
@@ -125,4 +151,7 @@ class CommandPreProcessor:
             cmd.append(token)
             i += 1
 
+        if deferred_error is not None:
+            raise ValueError(deferred_error)
+
         return cmd, redirects
@@ -1,10 +1,16 @@
 """Command validation for argv-based shell execution."""
 
+import functools
 import os
 import re
-from typing import Dict, List
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
 
 SHELL_METACHAR_PATTERN = re.compile(r"[\s;&|<>`\n\r]")
+# Operator fragments rejected anywhere inside a token. A lone "|" is handled by
+# exact match because a pipe embedded in an argument is literal data.
+SHELL_OPERATOR_FRAGMENT_PATTERN = re.compile(r";|&&|\|\||[`\n\r]")
+COMMAND_SEPARATORS = frozenset((";", "&&", "||"))
+SHELL_OPERATORS = COMMAND_SEPARATORS | {"|"}
 DANGEROUS_COMMANDS = {
     "sh",
     "bash",
@@ -52,6 +58,11 @@ DANGEROUS_COMMANDS = {
     "zip",
 }
 
+FIND_EXEC_OPTIONS = frozenset(("-exec", "-execdir"))
+FIND_FILE_OUTPUT_OPTIONS = frozenset(("-fprintf", "-fprint", "-fprint0", "-fls"))
+VERSIONED_PYTHON_PATTERN = re.compile(r"python\d+(?:\.\d+)*")
+WHITESPACE_RUN_PATTERN = re.compile(r"\s+")
+
 COMMAND_POLICY_ALIASES = {
     "bfind": "find",
     "bsdtar": "tar",
@@ -63,35 +74,56 @@ COMMAND_POLICY_ALIASES = {
 }
 
 
+@functools.lru_cache(maxsize=8)
+def _parse_allowed_commands(
+    allow_commands: str, allowed_commands: str
+) -> FrozenSet[str]:
+    """Parse the comma-separated command allowlists.
+
+    Validation consults the allowlist several times per command, so results are
+    cached by the raw environment values and re-parsed only when they change.
+    """
+    commands = allow_commands + "," + allowed_commands
+    return frozenset(filter(None, map(str.strip, commands.split(","))))
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_allowed_patterns(allow_patterns: str) -> Tuple[re.Pattern, ...]:
+    """Validate and compile the comma-separated ALLOW_PATTERNS value.
+
+    Patterns are kept separate rather than joined into one alternation, so
+    backreferences, group names and inline flags keep their per-pattern meaning.
+    """
+    compiled = []
+    for pattern in filter(None, map(str.strip, allow_patterns.split(","))):
+        if SHELL_METACHAR_PATTERN.search(pattern):
+            raise ValueError(f"Unsafe allowed command pattern: {pattern}")
+        compiled.append(re.compile(pattern))
+    return tuple(compiled)
+
+
 class CommandValidator:
     """Validates argv commands against allowlists and default deny rules."""
 
-    def __init__(self):
-        """Initialize the validator."""
-        return None
+    def __init__(self, env: Optional[Mapping[str, str]] = None):
+        """Initialize the validator.
 
-    def _get_allowed_commands(self) -> set[str]:
-        """Get the set of allowed commands from environment variables."""
-        allow_commands = os.environ.get("ALLOW_COMMANDS", "")
-        allowed_commands = os.environ.get("ALLOWED_COMMANDS", "")
-        commands = allow_commands + "," + allowed_commands
-        return {cmd.strip() for cmd in commands.split(",") if cmd.strip()}
+        Args:
+            env: Mapping to read the allowlist variables from. Defaults to
+                ``os.environ``, which is consulted live on every check.
+        """
+        self._env = os.environ if env is None else env
 
-    def _validate_pattern_source(self, pattern: str) -> None:
-        if re.search(r"[\s;&|<>`\n\r]", pattern):
-            raise ValueError(f"Unsafe allowed command pattern: {pattern}")
+    def _get_allowed_commands(self) -> FrozenSet[str]:
+        """Get the set of allowed commands from environment variables."""
+        return _parse_allowed_commands(
+            self._env.get("ALLOW_COMMANDS", ""),
+            self._env.get("ALLOWED_COMMANDS", ""),
+        )
 
-    def _get_allowed_patterns(self) -> List[re.Pattern]:
-        """Get the list of allowed regex patterns from environment variables."""
-        allow_patterns = os.environ.get("ALLOW_PATTERNS", "")
-        patterns = [
-            pattern.strip() for pattern in allow_patterns.split(",") if pattern.strip()
-        ]
-        compiled = []
-        for pattern in patterns:
-            self._validate_pattern_source(pattern)
-            compiled.append(re.compile(pattern))
-        return compiled
+    def _get_allowed_patterns(self) -> Tuple[re.Pattern, ...]:
+        """Get the compiled allowed regex patterns from environment variables."""
+        return _parse_allowed_patterns(self._env.get("ALLOW_PATTERNS", ""))
 
     def get_allowed_commands(self) -> list[str]:
         """Public API: return list form of allowed commands."""
@@ -117,11 +149,20 @@ class CommandValidator:
 
     def validate_no_shell_operators(self, cmd: str) -> None:
         """Validate that a token is not a shell operator or shell fragment."""
-        if cmd in [";", "&&", "||", "|"]:
-            raise ValueError(f"Unexpected shell operator: {cmd}")
-        if any(operator in cmd for operator in [";", "&&", "||", "`", "\n", "\r"]):
+        if cmd == "|" or SHELL_OPERATOR_FRAGMENT_PATTERN.search(cmd):
             raise ValueError(f"Unexpected shell operator: {cmd}")
 
+    def validate_argv_no_shell_operators(self, command: List[str]) -> None:
+        """Validate every argv token with one scan over the whole command.
+
+        Tokens are joined with NUL so a two-character operator cannot be formed
+        across a token boundary; only when something matches are the tokens
+        checked one by one to report the first offending token.
+        """
+        if "|" in command or SHELL_OPERATOR_FRAGMENT_PATTERN.search("\0".join(command)):
+            for token in command:
+                self.validate_no_shell_operators(token)
+
     def _has_option_value(self, args: List[str], option: str, predicate) -> bool:
         for index, arg in enumerate(args):
             if arg == option and index + 1 < len(args) and predicate(args[index + 1]):
@@ -164,7 +205,7 @@ class CommandValidator:
 
     def _policy_command_name(self, command: str) -> str:
         cmd = os.path.basename(self._validate_command_name_form(command))
-        if re.fullmatch(r"python\d+(?:\.\d+)*", cmd):
+        if VERSIONED_PYTHON_PATTERN.fullmatch(cmd):
             return "python"
         return COMMAND_POLICY_ALIASES.get(cmd, cmd)
 
@@ -175,11 +216,11 @@ class CommandValidator:
             raise ValueError(f"Command rejected by default security policy: {cmd}")
 
         if cmd == "find":
-            if any(arg in {"-exec", "-execdir"} for arg in args):
+            if not FIND_EXEC_OPTIONS.isdisjoint(args):
                 raise ValueError(
                     "Command rejected by default security policy: find -exec"
                 )
-            if any(arg in {"-fprintf", "-fprint", "-fprint0", "-fls"} for arg in args):
+            if not FIND_FILE_OUTPUT_OPTIONS.isdisjoint(args):
                 raise ValueError(
                     "Command rejected by default security policy: find file output"
                 )
@@ -187,7 +228,7 @@ class CommandValidator:
         if cmd == "awk" and (
             self._has_short_option_prefix(args, "-f")
             or any(
-                "system(" in (compact := re.sub(r"\s+", "", arg))
+                "system(" in (compact := WHITESPACE_RUN_PATTERN.sub("", arg))
                 or "|" in compact
                 or ">" in arg
                 or "<" in arg
@@ -254,6 +295,16 @@ class CommandValidator:
 
     def validate_pipeline(self, commands: List[str]) -> Dict[str, str]:
         """Validate pipeline tokens and ensure all command segments are allowed."""
+        self.split_pipeline(commands)
+        return {}
+
+    def split_pipeline(self, commands: List[str]) -> List[List[str]]:
+        """Validate pipeline tokens and return the validated command segments.
+
+        Equivalent to validate_pipeline followed by splitting on "|", done in
+        a single walk over the tokens.
+        """
+        segments: List[List[str]] = []
         current_cmd: List[str] = []
 
         for token in commands:
@@ -261,8 +312,9 @@ class CommandValidator:
                 if not current_cmd:
                     raise ValueError("Empty command before pipe operator")
                 self.validate_command(current_cmd)
+                segments.append(current_cmd)
                 current_cmd = []
-            elif token in [";", "&&", "||"]:
+            elif token in COMMAND_SEPARATORS:
                 raise ValueError(f"Unexpected shell operator in pipeline: {token}")
             else:
                 if not current_cmd:
@@ -271,8 +323,9 @@ class CommandValidator:
 
         if current_cmd:
             self.validate_command(current_cmd)
+            segments.append(current_cmd)
 
-        return {}
+        return segments
 
     def validate_command(self, command: List[str]) -> None:
         """Validate if the argv command is allowed to be executed."""
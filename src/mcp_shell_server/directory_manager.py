@@ -1,4 +1,5 @@
 import os
+import stat
 from typing import Optional
 
 
@@ -41,10 +42,13 @@ class DirectoryManager:
         if not os.path.isabs(directory):
             raise ValueError(f"Directory must be an absolute path: {directory}")
 
-        if not os.path.exists(directory):
-            raise ValueError(f"Directory does not exist: {directory}")
+        # One stat() answers both "exists" and "is a directory".
+        try:
+            mode = os.stat(directory).st_mode
+        except (OSError, ValueError):
+            raise ValueError(f"Directory does not exist: {directory}") from None
 
-        if not os.path.isdir(directory):
+        if not stat.S_ISDIR(mode):
             raise ValueError(f"Not a directory: {directory}")
 
         if not os.access(directory, os.R_OK | os.X_OK):
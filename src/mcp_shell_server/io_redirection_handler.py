@@ -6,6 +6,9 @@ import os
 from typing import IO, Any, Dict, List, Optional, Tuple, Union
 
 LOGGER = logging.getLogger(__name__)
+REDIRECTION_OPERATORS = frozenset((">", ">>", "<"))
+OUTPUT_REDIRECTION_OPERATORS = frozenset((">", ">>"))
+CLEANUP_HANDLE_KEYS = ("stdin", "stdout", "stderr")
 
 
 class IORedirectionHandler:
@@ -15,8 +18,8 @@ class IORedirectionHandler:
         """Validate the syntax of redirection operators in the command."""
         prev_token = None
         for token in command:
-            if token in [">", ">>", "<"]:
-                if prev_token and prev_token in [">", ">>", "<"]:
+            if token in REDIRECTION_OPERATORS:
+                if prev_token in REDIRECTION_OPERATORS:
                     raise ValueError(
                         "Invalid redirection syntax: consecutive operators"
                     )
@@ -26,27 +29,44 @@ class IORedirectionHandler:
         self, command: List[str]
     ) -> Tuple[List[str], Dict[str, Union[None, str, bool]]]:
         """Remove redirection operators from argv and return redirect metadata."""
-        self.validate_redirection_syntax(command)
-
-        cmd = []
         redirects: Dict[str, Union[None, str, bool]] = {
             "stdin": None,
             "stdout": None,
             "stdout_append": False,
         }
+        return self._strip_redirections(command, redirects), redirects
+
+    def strip_redirect_tokens(self, command: List[str]) -> List[str]:
+        """Remove redirection operators and targets from argv, discarding them.
+
+        Used for pipeline segments whose redirections are never applied; the
+        syntax is still validated so malformed segments fail the same way.
+        """
+        return self._strip_redirections(command, None)
 
+    def _strip_redirections(
+        self,
+        command: List[str],
+        redirects: Optional[Dict[str, Union[None, str, bool]]],
+    ) -> List[str]:
+        # An operator used as a target is exactly the first consecutive-operator
+        # pair, so this single walk reports what validate_redirection_syntax
+        # would without a separate pre-pass.
+        cmd = []
         i = 0
         while i < len(command):
             token = command[i]
 
-            if token in [">", ">>"]:
+            if token in OUTPUT_REDIRECTION_OPERATORS:
                 if i + 1 >= len(command):
                     raise ValueError("Missing path for output redirection")
-                if i + 1 < len(command) and command[i + 1] in [">", ">>", "<"]:
-                    raise ValueError("Invalid redirection target: operator found")
-                path = command[i + 1]
-                redirects["stdout"] = path
-                redirects["stdout_append"] = token == ">>"
+                if command[i + 1] in REDIRECTION_OPERATORS:
+                    raise ValueError(
+                        "Invalid redirection syntax: consecutive operators"
+                    )
+                if redirects is not None:
+                    redirects["stdout"] = command[i + 1]
+                    redirects["stdout_append"] = token == ">>"
                 i += 2
                 continue
 
@@ -54,16 +74,19 @@ class IORedirectionHandler:
                 if i + 1 >= len(command):
                     raise ValueError("Missing path for input redirection")
                 path = command[i + 1]
-                if path in [">", ">>", "<"]:
-                    raise ValueError("Invalid redirection target: operator found")
-                redirects["stdin"] = path
+                if path in REDIRECTION_OPERATORS:
+                    raise ValueError(
+                        "Invalid redirection syntax: consecutive operators"
+                    )
+                if redirects is not None:
+                    redirects["stdin"] = path
                 i += 2
                 continue
 
             cmd.append(token)
             i += 1
 
-        return cmd, redirects
+        return cmd
 
     def _resolve_redirection_path(self, target: str, directory: Optional[str]) -> str:
         """Resolve a redirection target and ensure it stays under directory."""
@@ -132,6 +155,13 @@ class IORedirectionHandler:
     ) -> Dict[str, Union[IO[Any], int, str, None]]:
         """Set up file handles for contained redirections."""
         handles: Dict[str, Union[IO[Any], int, str, None]] = {}
+        # Resolve the output target before opening the input file so a rejected
+        # target cannot leave the input descriptor behind.
+        stdout_path = (
+            self._resolve_redirection_path(str(redirects["stdout"]), directory)
+            if redirects["stdout"]
+            else None
+        )
 
         if redirects["stdin"]:
             path = self._resolve_redirection_path(str(redirects["stdin"]), directory)
@@ -140,12 +170,9 @@ class IORedirectionHandler:
                 extra={"path": path, "directory": directory},
             )
             try:
-                file = open(path, "r")
-                try:
-                    handles["stdin"] = asyncio.subprocess.PIPE
-                    handles["stdin_data"] = file.read()
-                finally:
-                    file.close()
+                # The child reads the file through its own descriptor, so the
+                # contents never have to be buffered in this process.
+                handles["stdin"] = await asyncio.to_thread(open, path, "rb")
             except (FileNotFoundError, IOError) as e:
                 LOGGER.error(
                     "Failed to open input redirection file",
@@ -154,16 +181,18 @@ class IORedirectionHandler:
                 )
                 raise ValueError("Failed to open input file") from e
 
-        if redirects["stdout"]:
-            path = self._resolve_redirection_path(str(redirects["stdout"]), directory)
-            mode = "a" if redirects.get("stdout_append") else "w"
+        if stdout_path:
+            path = stdout_path
+            # Binary mode: the child writes raw bytes through the descriptor.
+            mode = "ab" if redirects.get("stdout_append") else "wb"
             LOGGER.info(
                 "Opening contained output redirection",
                 extra={"path": path, "directory": directory, "mode": mode},
             )
             try:
-                handles["stdout"] = open(path, mode)
+                handles["stdout"] = await asyncio.to_thread(open, path, mode)
             except (IOError, PermissionError) as e:
+                await self.cleanup_handles(handles)
                 LOGGER.error(
                     "Failed to open output redirection file",
                     exc_info=True,
@@ -181,7 +210,7 @@ class IORedirectionHandler:
         self, handles: Dict[str, Union[IO[Any], int, None]]
     ) -> None:
         """Clean up file handles after command execution."""
-        for key in ["stdout", "stderr"]:
+        for key in CLEANUP_HANDLE_KEYS:
             handle = handles.get(key)
             if handle and hasattr(handle, "close") and not isinstance(handle, int):
                 try:
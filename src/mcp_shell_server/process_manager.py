@@ -2,21 +2,26 @@
 
 import asyncio
 import asyncio.streams
+import functools
+import io
 import logging
 import os
 import shlex
 import signal
 from collections.abc import Sequence
-from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, Union
 from weakref import WeakSet
 
 DEFAULT_SAFE_PATH = "/usr/local/bin:/usr/bin:/bin:/usr/sbin:/sbin"
 DEFAULT_TIMEOUT_SECONDS = 30
 DEFAULT_OUTPUT_LIMIT_BYTES = 1024 * 1024
+# Matches the default Linux pipe buffer so one read drains a full pipe.
+STREAM_READ_CHUNK_BYTES = 64 * 1024
 ENV_ALLOWLIST_VAR = "MCP_SHELL_ENV_ALLOWLIST"
 SAFE_PATH_VAR = "MCP_SHELL_SAFE_PATH"
 OUTPUT_LIMIT_VAR = "MCP_SHELL_OUTPUT_LIMIT_BYTES"
 TIMEOUT_VAR = "MCP_SHELL_DEFAULT_TIMEOUT_SECONDS"
+_SIGPIPE = getattr(signal, "SIGPIPE", 13)
 
 logger = logging.getLogger("mcp-shell-server.process")
 
@@ -72,10 +77,15 @@ def _redact_env_key_for_log(key: str) -> str:
     return key
 
 
-def _parse_env_key_list(value: Optional[str]) -> Set[str]:
-    """Parse a comma-separated environment key list using strict key validation."""
+@functools.lru_cache(maxsize=8)
+def _parse_env_key_list(value: Optional[str]) -> FrozenSet[str]:
+    """Parse a comma-separated environment key list using strict key validation.
+
+    The raw variable rarely changes, so results are cached by its value and
+    invalid keys are reported once per distinct configuration.
+    """
     if not value:
-        return set()
+        return frozenset()
 
     parsed: Set[str] = set()
     for raw_key in value.split(","):
@@ -83,13 +93,13 @@ def _parse_env_key_list(value: Optional[str]) -> Set[str]:
         if not key:
             continue
         if not _is_valid_env_key(key):
-            logging.warning(
+            logger.warning(
                 "Ignoring invalid child environment allowlist key: %s",
                 _redact_env_key_for_log(key),
             )
             continue
         parsed.add(key)
-    return parsed
+    return frozenset(parsed)
 
 
 def build_child_environment(envs: Optional[Dict[str, str]] = None) -> Dict[str, str]:
@@ -124,7 +134,7 @@ def build_child_environment(envs: Optional[Dict[str, str]] = None) -> Dict[str,
 
     invalid_keys = [key for key in envs if not _is_valid_env_key(key)]
     if invalid_keys:
-        logging.warning(
+        logger.warning(
             "Ignoring invalid child environment keys: %s",
             ",".join(_redact_env_key_for_log(key) for key in sorted(invalid_keys)),
         )
@@ -133,7 +143,7 @@ def build_child_environment(envs: Optional[Dict[str, str]] = None) -> Dict[str,
         key for key in envs if _is_valid_env_key(key) and key not in allowlisted_keys
     ]
     if disallowed_keys:
-        logging.info(
+        logger.info(
             "Ignoring child environment keys not present in %s: %s",
             CHILD_ENV_ALLOWLIST_VAR,
             ",".join(_redact_env_key_for_log(key) for key in sorted(disallowed_keys)),
@@ -152,6 +162,7 @@ class ProcessManager:
     def __init__(self):
         """Initialize ProcessManager with signal handling setup."""
         self._processes: Set[asyncio.subprocess.Process] = WeakSet()
+        self._reapers: Dict[asyncio.subprocess.Process, asyncio.Task] = {}
         self._original_sigint_handler = None
         self._original_sigterm_handler = None
         self._setup_signal_handlers()
@@ -169,8 +180,8 @@ class ProcessManager:
                         if process.returncode is None:
                             process.terminate()
                     except Exception as e:
-                        logging.warning(
-                            f"Error terminating process on signal {signum}: {e}"
+                        logger.warning(
+                            "Error terminating process on signal %s: %s", signum, e
                         )
 
             if signum == signal.SIGINT and self._original_sigint_handler:
@@ -204,7 +215,7 @@ class ProcessManager:
         if isinstance(argv, str):
             # Backward-compatible internal adapter only. Runtime callers pass argv lists.
             argv = shlex.split(argv)
-        normalized = [str(part) for part in argv if str(part) != ""]
+        normalized = [part for part in map(str, argv) if part]
         if not normalized:
             raise ValueError("Empty command")
         return normalized
@@ -219,11 +230,11 @@ class ProcessManager:
             "LC_ALL": "C",
         }
 
-        allowlist = {
-            name.strip()
-            for name in os.environ.get(ENV_ALLOWLIST_VAR, "").split(",")
-            if name.strip()
-        }
+        allowlist = set(
+            filter(
+                None, map(str.strip, os.environ.get(ENV_ALLOWLIST_VAR, "").split(","))
+            )
+        )
         for name in allowlist:
             if name in os.environ:
                 child_env[name] = os.environ[name]
@@ -253,12 +264,14 @@ class ProcessManager:
         self, processes: Optional[List[asyncio.subprocess.Process]] = None
     ) -> None:
         """Clean up processes by killing them if they're still running."""
+        reapers: List[asyncio.Task] = []
         if processes is None:
             processes = list(self._processes)
+            reapers = list(self._reapers.values())
 
         cleanup_tasks = []
         for process in processes:
-            if process.returncode is None:
+            if process.returncode is None and process not in self._reapers:
                 try:
                     process.terminate()
                     try:
@@ -269,15 +282,16 @@ class ProcessManager:
                 except ProcessLookupError:
                     pass
                 except Exception as e:
-                    logging.warning(f"Error killing process: {e}")
+                    logger.warning("Error killing process: %s", e)
 
+        cleanup_tasks.extend(reapers)
         if cleanup_tasks:
             try:
                 await asyncio.wait(cleanup_tasks, timeout=5)
             except asyncio.TimeoutError:
-                logging.error("Process cleanup timed out")
+                logger.error("Process cleanup timed out")
             except Exception as e:
-                logging.error(f"Error during process cleanup: {e}")
+                logger.error("Error during process cleanup: %s", e)
 
     async def cleanup_all(self) -> None:
         """Clean up all tracked processes."""
@@ -294,31 +308,37 @@ class ProcessManager:
         stdout_handle: Any = asyncio.subprocess.PIPE,
         envs: Optional[Dict[str, str]] = None,
         timeout: Optional[int] = None,
+        stdin_handle: Any = asyncio.subprocess.PIPE,
+        child_env: Optional[Dict[str, str]] = None,
     ) -> asyncio.subprocess.Process:
         """Create a subprocess using argv-based execution.
 
         The public execution path passes argv lists; string input is split only for
         backward-compatible internal tests and is never handed to a shell.
         Additional envs are forwarded only when they are listed in
-        MCP_SHELL_CHILD_ENV_ALLOWLIST.
+        MCP_SHELL_CHILD_ENV_ALLOWLIST. ``stdin_handle`` lets pipeline stages read
+        directly from the previous stage's pipe descriptor, and ``child_env``
+        lets them share one environment built by build_child_environment.
         """
         del stdin, timeout
         normalized_argv = self._normalize_argv(argv)
-        child_env = build_child_environment(envs)
-        logger.debug(
-            "creating subprocess",
-            extra={
-                "argv0": normalized_argv[0],
-                "argc": len(normalized_argv),
-                "cwd": directory,
-                "env_keys": sorted(child_env),
-            },
-        )
+        if child_env is None:
+            child_env = build_child_environment(envs)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "creating subprocess",
+                extra={
+                    "argv0": normalized_argv[0],
+                    "argc": len(normalized_argv),
+                    "cwd": directory,
+                    "env_keys": sorted(child_env),
+                },
+            )
 
         try:
             process = await asyncio.create_subprocess_exec(
                 *normalized_argv,
-                stdin=asyncio.subprocess.PIPE,
+                stdin=stdin_handle,
                 stdout=stdout_handle,
                 stderr=asyncio.subprocess.PIPE,
                 env=child_env,
@@ -333,6 +353,36 @@ class ProcessManager:
                 f"Unexpected error during process creation: {str(e)}"
             ) from e
 
+    def reap_in_background(self, process: asyncio.subprocess.Process) -> None:
+        """Kill a process and wait for it in a background task.
+
+        Timeout paths use this to return immediately instead of blocking until
+        the child has exited. Each process gets its own task so that several
+        timed-out pipeline stages sit out their terminate grace period
+        concurrently. cleanup_processes() waits for outstanding reapers; a
+        reaper cancelled by event loop shutdown still kills and collects its
+        child before the loop closes.
+        """
+        if process.returncode is not None or process in self._reapers:
+            return
+        task = asyncio.create_task(self._reap(process))
+        self._reapers[process] = task
+        task.add_done_callback(lambda _: self._reapers.pop(process, None))
+
+    async def _reap(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            await self._kill_process(process)
+        except asyncio.CancelledError:
+            # asyncio.run() cancels pending tasks on the way out; finish the
+            # reap with SIGKILL while the loop can still observe the exit.
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            raise
+
     async def _kill_process(self, process: asyncio.subprocess.Process) -> None:
         if process.returncode is not None:
             return
@@ -347,7 +397,7 @@ class ProcessManager:
         except ProcessLookupError:
             pass
         except Exception as e:
-            logging.warning(f"Error killing process: {e}")
+            logger.warning("Error killing process: %s", e)
 
     async def _read_stream_limited(
         self,
@@ -360,7 +410,7 @@ class ProcessManager:
         data = bytearray()
         while True:
             remaining = max(1, limit + 1 - len(data))
-            chunk = await stream.read(min(8192, remaining))
+            chunk = await stream.read(min(STREAM_READ_CHUNK_BYTES, remaining))
             if not chunk:
                 return bytes(data)
             data.extend(chunk)
@@ -397,32 +447,63 @@ class ProcessManager:
                 )
             return stdout, stderr
 
-        if stdin_stream is not None:
-            if stdin_bytes:
-                stdin_stream.write(stdin_bytes)
-                await stdin_stream.drain()
-            stdin_stream.close()
-            if hasattr(stdin_stream, "wait_closed"):
-                await stdin_stream.wait_closed()
-
+        # Feed stdin while draining stdout/stderr so a child that fills its
+        # output pipe before consuming all input cannot deadlock the exchange.
+        stdin_task = asyncio.create_task(self._feed_stdin(stdin_stream, stdin_bytes))
         stdout_task = asyncio.create_task(
             self._read_stream_limited(stdout_stream, "stdout", output_limit)
         )
         stderr_task = asyncio.create_task(
             self._read_stream_limited(stderr_stream, "stderr", output_limit)
         )
+        tasks = (stdin_task, stdout_task, stderr_task)
 
         try:
-            stdout, stderr = await asyncio.gather(stdout_task, stderr_task)
+            _, stdout, stderr = await asyncio.gather(*tasks)
             await process.wait()
             return stdout, stderr
         except OutputLimitExceeded:
-            for task in (stdout_task, stderr_task):
+            for task in tasks:
                 if not task.done():
                     task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
             await self._kill_process(process)
+            await self._discard_output(stdout_stream, stderr_stream)
+            raise
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
             raise
 
+    async def _discard_output(self, *streams: Any) -> None:
+        """Drain what a killed child left unread so its pipes reach EOF.
+
+        A read transport paused on a full buffer never notices EOF; left that
+        way it is only closed by garbage collection, after the loop is gone.
+        """
+        try:
+            async with asyncio.timeout(1.0):
+                for stream in streams:
+                    if stream is not None:
+                        while await stream.read(STREAM_READ_CHUNK_BYTES):
+                            pass
+        except (asyncio.TimeoutError, OSError):
+            pass
+
+    async def _feed_stdin(self, stream: Any, data: Optional[bytes]) -> None:
+        if stream is None:
+            return
+        try:
+            if data:
+                stream.write(data)
+                await stream.drain()
+            stream.close()
+            if hasattr(stream, "wait_closed"):
+                await stream.wait_closed()
+        except (BrokenPipeError, ConnectionResetError):
+            # The child exited or closed stdin without reading everything.
+            pass
+
     async def execute_with_timeout(
         self,
         process: asyncio.subprocess.Process,
@@ -440,14 +521,14 @@ class ProcessManager:
         )
 
         try:
-            return await asyncio.wait_for(
-                self._communicate_with_output_limit(
+            # asyncio.timeout cancels the current task on expiry instead of
+            # wrapping the exchange in an extra Task as wait_for does.
+            async with asyncio.timeout(effective_timeout):
+                return await self._communicate_with_output_limit(
                     process, stdin_bytes=stdin_bytes, output_limit=effective_limit
-                ),
-                timeout=effective_timeout,
-            )
+                )
         except asyncio.TimeoutError:
-            await self._kill_process(process)
+            self.reap_in_background(process)
             raise
         except OutputLimitExceeded:
             raise
@@ -464,56 +545,86 @@ class ProcessManager:
         timeout: Optional[int] = None,
         envs: Optional[Dict[str, str]] = None,
         output_limit: Optional[int] = None,
+        first_stdin_handle: Any = None,
     ) -> Tuple[bytes, bytes, int]:
-        """Execute a pipeline of argv command segments sequentially."""
+        """Execute a pipeline of argv command segments connected by OS pipes.
+
+        All stages are started up front and each stage's stdout is wired to the
+        next stage's stdin with ``os.pipe()``, so intermediate output streams
+        through the kernel instead of being buffered in Python. Only the final
+        stdout and every stage's stderr are read back, under a single timeout
+        covering the whole pipeline. ``first_stdin_handle`` (e.g. an input
+        redirection file) is handed to the first stage in place of a pipe.
+        """
         if not commands:
             raise ValueError("No commands provided")
 
+        effective_timeout = timeout or self._configured_int(
+            TIMEOUT_VAR, DEFAULT_TIMEOUT_SECONDS
+        )
+        effective_limit = output_limit or self._configured_int(
+            OUTPUT_LIMIT_VAR, DEFAULT_OUTPUT_LIMIT_BYTES
+        )
+
         processes: List[asyncio.subprocess.Process] = []
         try:
-            prev_stdout: Optional[bytes] = first_stdin
-            final_stderr: bytes = b""
-            final_stdout: bytes = b""
-
-            for i, cmd in enumerate(commands):
-                stdout_target = (
-                    asyncio.subprocess.PIPE
-                    if i < len(commands) - 1 or not last_stdout
-                    else last_stdout
-                )
-                process = await self.create_process(
-                    cmd,
-                    directory,
-                    stdout_handle=stdout_target,
-                    envs=envs,
-                    timeout=timeout,
-                )
-                if not hasattr(process, "is_running"):
-                    process.is_running = lambda self=process: self.returncode is None  # type: ignore
-                processes.append(process)
+            await self._spawn_pipeline(
+                processes,
+                commands,
+                last_stdout,
+                directory,
+                envs,
+                first_stdin_handle=first_stdin_handle,
+            )
 
-                stdout, stderr = await self.execute_with_timeout(
-                    process,
-                    stdin=prev_stdout.decode() if prev_stdout else None,
-                    timeout=timeout,
-                    output_limit=output_limit,
+            tasks = [
+                asyncio.create_task(
+                    self._communicate_with_output_limit(
+                        process,
+                        stdin_bytes=first_stdin if i == 0 else None,
+                        output_limit=effective_limit,
+                    )
                 )
-
-                final_stderr += stderr if stderr else b""
-                if process.returncode != 0:
-                    error_msg = stderr.decode("utf-8", errors="replace").strip()
-                    if not error_msg:
-                        error_msg = (
-                            f"Command failed with exit code {process.returncode}"
-                        )
-                    raise ValueError(error_msg)
-
-                if i == len(commands) - 1:
-                    final_stdout = stdout if stdout else b""
-                    if last_stdout and hasattr(last_stdout, "write") and stdout:
-                        last_stdout.write(stdout.decode("utf-8", errors="replace"))
+                for i, process in enumerate(processes)
+            ]
+            try:
+                async with asyncio.timeout(effective_timeout):
+                    results = await asyncio.gather(*tasks)
+            except BaseException as e:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if isinstance(e, asyncio.TimeoutError):
+                    for process in processes:
+                        self.reap_in_background(process)
                 else:
-                    prev_stdout = stdout if stdout else b""
+                    await asyncio.gather(
+                        *(self._kill_process(process) for process in processes)
+                    )
+                raise
+
+            final_stderr = b"".join(stderr for _, stderr in results if stderr)
+            last_index = len(processes) - 1
+            for i, (process, (_, stderr)) in enumerate(
+                zip(processes, results, strict=True)
+            ):
+                if process.returncode == 0:
+                    continue
+                # Upstream stages are expected to die of SIGPIPE when a later
+                # stage stops reading early (e.g. ``yes | head -n 1``).
+                if i < last_index and process.returncode == -_SIGPIPE:
+                    continue
+                error_msg = (stderr or b"").decode("utf-8", errors="replace").strip()
+                if not error_msg:
+                    error_msg = f"Command failed with exit code {process.returncode}"
+                raise ValueError(error_msg)
+
+            final_stdout = results[-1][0] or b""
+            if last_stdout and hasattr(last_stdout, "write") and final_stdout:
+                if isinstance(last_stdout, io.TextIOBase):
+                    last_stdout.write(final_stdout.decode("utf-8", errors="replace"))
+                else:
+                    last_stdout.write(final_stdout)
 
             return (
                 final_stdout,
@@ -526,3 +637,66 @@ class ProcessManager:
             )
         finally:
             await self.cleanup_processes(processes)
+
+    async def _spawn_pipeline(
+        self,
+        processes: List[asyncio.subprocess.Process],
+        commands: List[List[str]],
+        last_stdout: Any,
+        directory: Optional[str],
+        envs: Optional[Dict[str, str]],
+        first_stdin_handle: Any = None,
+    ) -> None:
+        """Start every pipeline stage, chaining them with OS pipe descriptors.
+
+        Started processes are appended to ``processes`` as they are created so
+        the caller can clean them up if a later stage fails to start. The
+        parent's copies of the pipe descriptors are always closed.
+        """
+        last_index = len(commands) - 1
+        # Every stage gets the same environment, so build (and log) it once.
+        child_env = build_child_environment(envs)
+        read_fd: Optional[int] = None
+        try:
+            for i, cmd in enumerate(commands):
+                write_fd: Optional[int] = None
+                next_read_fd: Optional[int] = None
+                if read_fd is not None:
+                    stdin_target: Any = read_fd
+                elif i == 0 and first_stdin_handle is not None:
+                    stdin_target = first_stdin_handle
+                else:
+                    stdin_target = asyncio.subprocess.PIPE
+                if i < last_index:
+                    next_read_fd, write_fd = os.pipe()
+                    stdout_target: Any = write_fd
+                else:
+                    stdout_target = last_stdout or asyncio.subprocess.PIPE
+
+                try:
+                    process = await self.create_process(
+                        cmd,
+                        directory,
+                        stdout_handle=stdout_target,
+                        envs=envs,
+                        stdin_handle=stdin_target,
+                        child_env=child_env,
+                    )
+                except BaseException:
+                    if next_read_fd is not None:
+                        os.close(next_read_fd)
+                    raise
+                finally:
+                    if read_fd is not None:
+                        os.close(read_fd)
+                        read_fd = None
+                    if write_fd is not None:
+                        os.close(write_fd)
+
+                if not hasattr(process, "is_running"):
+                    process.is_running = lambda self=process: self.returncode is None  # type: ignore
+                processes.append(process)
+                read_fd = next_read_fd
+        finally:
+            if read_fd is not None:
+                os.close(read_fd)
@@ -1,12 +1,11 @@
 import asyncio
 import hashlib
-import inspect
 import io
 import logging
 import os
 import pwd
 import time
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from mcp_shell_server.command_preprocessor import CommandPreProcessor
 from mcp_shell_server.command_validator import CommandValidator
@@ -14,7 +13,8 @@ from mcp_shell_server.directory_manager import DirectoryManager
 from mcp_shell_server.io_redirection_handler import IORedirectionHandler
 from mcp_shell_server.process_manager import OutputLimitExceeded, ProcessManager
 
-logger = logging.getLogger("mcp-shell-server.audit")
+audit_logger = logging.getLogger("mcp-shell-server.audit")
+logger = logging.getLogger(__name__)
 SECRET_MARKERS = (
     "SECRET",
     "TOKEN",
@@ -31,19 +31,36 @@ SECRET_MARKERS = (
 SECRET_REDACTION = "[REDACTED]"
 HASH_REDACTION_PREFIX = "[sha256:"
 
+# Stateless collaborators shared by every executor. ProcessManager is not shared
+# because it tracks live child processes and installs signal handlers.
+_VALIDATOR = CommandValidator()
+_DIRECTORY_MANAGER = DirectoryManager()
+_IO_HANDLER = IORedirectionHandler()
+_PREPROCESSOR = CommandPreProcessor()
+
 
 class ShellExecutor:
     """Executes argv commands after validation against the configured policy."""
 
+    __slots__ = (
+        "validator",
+        "directory_manager",
+        "io_handler",
+        "preprocessor",
+        "process_manager",
+        "_default_shell",
+    )
+
     def __init__(self, process_manager: Optional[ProcessManager] = None):
         """Initialize the executor with validators, IO handling, and process manager."""
-        self.validator = CommandValidator()
-        self.directory_manager = DirectoryManager()
-        self.io_handler = IORedirectionHandler()
-        self.preprocessor = CommandPreProcessor()
+        self.validator = _VALIDATOR
+        self.directory_manager = _DIRECTORY_MANAGER
+        self.io_handler = _IO_HANDLER
+        self.preprocessor = _PREPROCESSOR
         self.process_manager = (
             process_manager if process_manager is not None else ProcessManager()
         )
+        self._default_shell: Optional[str] = None
 
     def _validate_command(self, command: List[str]) -> None:
         if not command:
@@ -60,19 +77,16 @@ class ShellExecutor:
         return self.validator.validate_pipeline(commands)
 
     def _get_default_shell(self) -> str:
+        if self._default_shell is None:
+            self._default_shell = self._compute_default_shell()
+        return self._default_shell
+
+    def _compute_default_shell(self) -> str:
         try:
             return pwd.getpwuid(os.getuid()).pw_shell
         except (ImportError, KeyError):
             return os.environ.get("SHELL", "/bin/sh")
 
-    async def _kill_process(self, process: Any) -> None:
-        try:
-            result = process.kill()
-            if inspect.isawaitable(result):
-                await result
-        except ProcessLookupError:
-            pass
-
     def _contains_secret_marker(self, value: str) -> bool:
         upper = value.upper()
         return any(marker in upper for marker in SECRET_MARKERS)
@@ -157,7 +171,26 @@ class ShellExecutor:
             event["rejection_reason"] = self._redact_scalar(rejection_reason)
         if error_type is not None:
             event["error_type"] = error_type
-        logger.info("shell_execution_audit", extra={"audit": event})
+        audit_logger.info("shell_execution_audit", extra={"audit": event})
+
+    def _close_redirect_handle(self, handle: Any, stream_name: str) -> None:
+        if hasattr(handle, "close") and not isinstance(handle, int):
+            try:
+                handle.close()
+            except (IOError, OSError) as e:
+                logger.warning("Error closing %s: %s", stream_name, e)
+
+    @staticmethod
+    def _format_output(
+        data: Optional[bytes], binary: bool, strip: bool = False
+    ) -> Union[str, bytes]:
+        """Return raw bytes for binary callers, otherwise decoded text."""
+        if binary:
+            return data or b""
+        if not data:
+            return ""
+        text = data.decode("utf-8", errors="replace")
+        return text.strip() if strip else text
 
     def _error_result(
         self,
@@ -181,6 +214,7 @@ class ShellExecutor:
         timeout: Optional[int] = None,
         envs: Optional[Dict[str, str]] = None,
         output_limit: Optional[int] = None,
+        binary: bool = False,
     ) -> Dict[str, Any]:
         start_time = time.time()
         process = None
@@ -205,7 +239,8 @@ class ShellExecutor:
                 return self._error_result(str(e), start_time)
 
             preprocessed_command = self.preprocessor.preprocess_command(command)
-            cleaned_command = self.preprocessor.clean_command(preprocessed_command)
+            cleaned = self.preprocessor.clean_command(preprocessed_command)
+            cleaned_command = cleaned.tokens
             if not cleaned_command:
                 self._audit(
                     "rejected",
@@ -220,32 +255,19 @@ class ShellExecutor:
                 )
                 return self._error_result("Empty command", start_time)
 
-            if "|" in cleaned_command:
+            if cleaned.has_pipe:
                 try:
-                    self.validator.validate_pipeline(cleaned_command)
-                    commands = self.preprocessor.split_pipe_commands(cleaned_command)
+                    commands = self.validator.split_pipeline(cleaned_command)
                     if not commands:
                         raise ValueError("Empty command before pipe operator")
                     return await self._execute_pipeline(
-                        commands, directory, timeout, envs, output_limit=output_limit
-                    )
-                except ValueError as e:
-                    self._audit(
-                        "rejected",
-                        cleaned_command,
+                        commands,
                         directory,
-                        start_time,
-                        stderr=str(e),
-                        timeout=timeout,
+                        timeout,
+                        envs,
                         output_limit=output_limit,
-                        envs=envs,
-                        rejection_reason=str(e),
+                        binary=binary,
                     )
-                    return self._error_result(str(e), start_time)
-
-            for token in cleaned_command:
-                try:
-                    self.validator.validate_no_shell_operators(token)
                 except ValueError as e:
                     self._audit(
                         "rejected",
@@ -261,11 +283,27 @@ class ShellExecutor:
                     return self._error_result(str(e), start_time)
 
             try:
-                cmd, redirects = self.preprocessor.parse_command(cleaned_command)
-                # Re-run the redirection handler syntax/parser so the contained IO
-                # path owns runtime redirection semantics while preserving the
-                # historical parser error surface used by callers and tests.
-                cmd, redirects = self.io_handler.process_redirections(cleaned_command)
+                self.validator.validate_argv_no_shell_operators(cleaned_command)
+            except ValueError as e:
+                self._audit(
+                    "rejected",
+                    cleaned_command,
+                    directory,
+                    start_time,
+                    stderr=str(e),
+                    timeout=timeout,
+                    output_limit=output_limit,
+                    envs=envs,
+                    rejection_reason=str(e),
+                )
+                return self._error_result(str(e), start_time)
+
+            try:
+                if cleaned.has_redirect:
+                    cmd, redirects = self.preprocessor.parse_command(cleaned_command)
+                else:
+                    cmd = cleaned_command
+                    redirects = {"stdin": None, "stdout": None, "stdout_append": False}
                 redirection_metadata = {
                     "stdin": bool(redirects.get("stdin")),
                     "stdout": bool(redirects.get("stdout")),
@@ -287,12 +325,21 @@ class ShellExecutor:
                 )
                 return self._error_result(str(e), start_time)
 
+            stdin_handle: Any = asyncio.subprocess.PIPE
             stdout_handle: Any = asyncio.subprocess.PIPE
             try:
-                handles = await self.io_handler.setup_redirects(redirects, directory)
-                stdin_data = handles.get("stdin_data")
-                if isinstance(stdin_data, str):
-                    stdin = stdin_data
+                # Plain argv commands keep the default pipes; only commands that
+                # actually redirect need contained file handles set up.
+                handles = (
+                    await self.io_handler.setup_redirects(redirects, directory)
+                    if cleaned.has_redirect
+                    else {}
+                )
+                stdin_value = handles.get("stdin")
+                if hasattr(stdin_value, "read"):
+                    # A redirected input file replaces any inline stdin.
+                    stdin_handle = stdin_value
+                    stdin = None
 
                 stdout_value = handles.get("stdout")
                 if (
@@ -323,12 +370,11 @@ class ShellExecutor:
                     stdout_handle=stdout_handle,
                     envs=envs,
                     timeout=timeout,
+                    stdin_handle=stdin_handle,
                 )
             except Exception as e:
-                if hasattr(stdout_handle, "close") and not isinstance(
-                    stdout_handle, int
-                ):
-                    stdout_handle.close()
+                self._close_redirect_handle(stdin_handle, "stdin")
+                self._close_redirect_handle(stdout_handle, "stdout")
                 self._audit(
                     "process_error",
                     cmd,
@@ -344,6 +390,11 @@ class ShellExecutor:
                 )
                 return self._error_result(str(e), start_time)
 
+            # The child holds its own copies of redirected descriptors and uses
+            # them directly, so the parent's copies can be released now.
+            self._close_redirect_handle(stdin_handle, "stdin")
+            self._close_redirect_handle(stdout_handle, "stdout")
+
             try:
                 stdout, stderr = await asyncio.shield(
                     self.process_manager.execute_with_timeout(
@@ -354,19 +405,11 @@ class ShellExecutor:
                     )
                 )
 
-                if hasattr(stdout_handle, "close") and not isinstance(
-                    stdout_handle, int
-                ):
-                    try:
-                        stdout_handle.close()
-                    except (IOError, OSError) as e:
-                        logging.warning(f"Error closing stdout: {e}")
-
                 final_returncode = (
                     0 if process.returncode is None else process.returncode
                 )
-                stdout_text = stdout.decode(errors="replace").strip() if stdout else ""
-                stderr_text = stderr.decode(errors="replace").strip() if stderr else ""
+                stdout_text = self._format_output(stdout, binary, strip=True)
+                stderr_text = self._format_output(stderr, binary, strip=True)
                 self._audit(
                     "success",
                     cmd,
@@ -392,18 +435,6 @@ class ShellExecutor:
                 }
 
             except asyncio.TimeoutError:
-                if process and process.returncode is None:
-                    try:
-                        await self._kill_process(process)
-                        await asyncio.shield(process.wait())
-                    except ProcessLookupError:
-                        pass
-
-                if hasattr(stdout_handle, "close") and not isinstance(
-                    stdout_handle, int
-                ):
-                    stdout_handle.close()
-
                 message = f"Command timed out after {timeout} seconds"
                 self._audit(
                     "timeout",
@@ -420,10 +451,6 @@ class ShellExecutor:
                 )
                 return self._error_result(message, start_time, status=-1)
             except OutputLimitExceeded as e:
-                if hasattr(stdout_handle, "close") and not isinstance(
-                    stdout_handle, int
-                ):
-                    stdout_handle.close()
                 message = str(e)
                 self._audit(
                     "output_cap",
@@ -442,10 +469,6 @@ class ShellExecutor:
                 )
                 return self._error_result(message, start_time, status=-1)
             except Exception as e:
-                if hasattr(stdout_handle, "close") and not isinstance(
-                    stdout_handle, int
-                ):
-                    stdout_handle.close()
                 self._audit(
                     "process_error",
                     cmd,
@@ -463,8 +486,7 @@ class ShellExecutor:
 
         finally:
             if process and process.returncode is None:
-                await self._kill_process(process)
-                await process.wait()
+                self.process_manager.reap_in_background(process)
 
     async def _execute_pipeline(
         self,
@@ -473,37 +495,43 @@ class ShellExecutor:
         timeout: Optional[int] = None,
         envs: Optional[Dict[str, str]] = None,
         output_limit: Optional[int] = None,
+        binary: bool = False,
     ) -> Dict[str, Any]:
         start_time = time.time()
         redirection_metadata: Dict[str, Any] = {}
+        pipeline_stdin: Any = None
+        pipeline_stdout: Any = None
         try:
+            if not commands:
+                raise ValueError("No commands provided")
             for cmd in commands:
                 self.validator.validate_command(cmd)
 
-            parsed_commands = []
-            first_stdin: Optional[bytes] = None
-            pipeline_stdout: Any = None
-            first_redirects = None
             last_redirects = None
 
-            for i, command in enumerate(commands):
-                cmd, redirects = self.io_handler.process_redirections(command)
-                parsed_commands.append(cmd)
-
-                if i == 0:
-                    first_redirects = redirects
-                elif i == len(commands) - 1:
-                    last_redirects = redirects
+            # Only the first segment's stdin and the last segment's stdout are
+            # wired up, so middle segments just have their redirections stripped.
+            first_cmd, first_redirects = self.io_handler.process_redirections(
+                commands[0]
+            )
+            parsed_commands = [first_cmd]
+            parsed_commands.extend(
+                self.io_handler.strip_redirect_tokens(command)
+                for command in commands[1:-1]
+            )
+            if len(commands) > 1:
+                last_cmd, last_redirects = self.io_handler.process_redirections(
+                    commands[-1]
+                )
+                parsed_commands.append(last_cmd)
 
             if first_redirects:
                 handles = await self.io_handler.setup_redirects(
                     first_redirects, directory
                 )
-                stdin_data = handles.get("stdin_data")
-                if stdin_data:
-                    first_stdin = (
-                        stdin_data.encode() if isinstance(stdin_data, str) else None
-                    )
+                stdin_value = handles.get("stdin")
+                if hasattr(stdin_value, "read"):
+                    pipeline_stdin = stdin_value
                 redirection_metadata["stdin"] = bool(first_redirects.get("stdin"))
 
             if last_redirects:
@@ -526,7 +554,7 @@ class ShellExecutor:
                 stdout, stderr, returncode = (
                     await self.process_manager.execute_pipeline(
                         parsed_commands,
-                        first_stdin=first_stdin,
+                        first_stdin_handle=pipeline_stdin,
                         last_stdout=pipeline_stdout,
                         directory=directory,
                         timeout=timeout,
@@ -535,12 +563,8 @@ class ShellExecutor:
                     )
                 )
 
-                final_output = (
-                    stdout.decode("utf-8", errors="replace") if stdout else ""
-                )
-                final_stderr = (
-                    stderr.decode("utf-8", errors="replace") if stderr else ""
-                )
+                final_output = self._format_output(stdout, binary)
+                final_stderr = self._format_output(stderr, binary)
                 self._audit(
                     "success",
                     [part for cmd in parsed_commands for part in [*cmd, "|"]][:-1],
@@ -600,15 +624,11 @@ class ShellExecutor:
                     envs=envs,
                     error_type=type(e).__name__,
                 )
-                return {
-                    "error": str(e),
-                    "stdout": "",
-                    "stderr": str(e),
-                    "status": -1 if isinstance(e, TimeoutError) else 1,
-                    "execution_time": time.time() - start_time,
-                }
-            finally:
-                await self.io_handler.cleanup_handles({"stdout": pipeline_stdout})
+                return self._error_result(
+                    str(e),
+                    start_time,
+                    status=-1 if isinstance(e, TimeoutError) else 1,
+                )
 
         except Exception as e:
             self._audit(
@@ -624,3 +644,7 @@ class ShellExecutor:
                 rejection_reason=str(e),
             )
             return self._error_result(str(e), start_time)
+        finally:
+            await self.io_handler.cleanup_handles(
+                {"stdin": pipeline_stdin, "stdout": pipeline_stdout}
+            )
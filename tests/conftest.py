@@ -2,8 +2,8 @@
 Test configuration and fixtures.
 """
 
-import asyncio
 import io
+import platform
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -11,6 +11,23 @@ import pytest_asyncio
 
 from mcp_shell_server.shell_executor import ShellExecutor
 
+# The macOS process tests are not even imported on other platforms
+collect_ignore = []
+if platform.system() != "Darwin":
+    collect_ignore.append("test_process_manager_macos.py")
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+if uvloop is not None:
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_asyncio_loop_factories(config, item):
+        """Run async tests on uvloop's event loop, as the server does."""
+        return {"uvloop": uvloop.new_event_loop}
+
 
 @pytest.fixture
 def mock_file(mocker):
@@ -64,35 +81,3 @@ async def shell_executor_with_mock(mock_process_manager):
 def temp_test_dir(tmpdir):
     """Provide a temporary test directory."""
     return str(tmpdir)
-
-
-@pytest_asyncio.fixture(scope="function")
-async def event_loop():
-    """Create and provide a new event loop for each module."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    yield loop
-
-    # Clean up the event loop
-    try:
-        # Close all tasks
-        tasks = asyncio.all_tasks(loop)
-        if tasks:
-            # Cancel all tasks and wait for their completion
-            for task in tasks:
-                task.cancel()
-            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
-
-        # Clean up all transports
-        if hasattr(loop, "_transports"):
-            for transport in list(loop._transports.values()):
-                if hasattr(transport, "close"):
-                    transport.close()
-
-        # Cleanup
-        loop.stop()
-        asyncio.set_event_loop(None)
-        await loop.shutdown_asyncgens()
-        loop.close()
-    except Exception as e:
-        print(f"Error during loop cleanup: {e}")
@@ -2,7 +2,11 @@
 
 import pytest
 
-from mcp_shell_server.command_validator import CommandValidator
+from mcp_shell_server.command_validator import (
+    CommandValidator,
+    _parse_allowed_commands,
+    _parse_allowed_patterns,
+)
 
 
 def clear_env(monkeypatch):
@@ -11,7 +15,7 @@ def clear_env(monkeypatch):
     monkeypatch.delenv("ALLOW_PATTERNS", raising=False)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def validator():
     return CommandValidator()
 
@@ -22,18 +26,50 @@ def test_get_allowed_commands(validator, monkeypatch):
     monkeypatch.setenv("ALLOWED_COMMANDS", "cmd3,cmd4")
     assert set(validator.get_allowed_commands()) == {"cmd1", "cmd2", "cmd3", "cmd4"}
 
+    # An explicit mapping is used instead of os.environ
+    isolated = CommandValidator(env={"ALLOW_COMMANDS": "cmd5"})
+    assert isolated.get_allowed_commands() == ["cmd5"]
+
+
+def test_allowed_commands_are_parsed_once_per_value(validator, monkeypatch):
+    clear_env(monkeypatch)
+    monkeypatch.setenv("ALLOW_COMMANDS", "cmd1, cmd2")
+    _parse_allowed_commands.cache_clear()
+
+    first = validator._get_allowed_commands()
+    second = validator._get_allowed_commands()
+    assert first == frozenset({"cmd1", "cmd2"})
+    assert second is first
+
+    # A changed environment value is picked up immediately
+    monkeypatch.setenv("ALLOW_COMMANDS", "cmd3")
+    assert validator._get_allowed_commands() == frozenset({"cmd3"})
 
-def test_is_command_allowed_with_patterns(validator, monkeypatch):
+
+def test_allowed_patterns_are_compiled_once_per_value(validator, monkeypatch):
     clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "allowed_cmd")
-    monkeypatch.setenv("ALLOW_PATTERNS", "^cmd[0-9]+$")
+    monkeypatch.setenv("ALLOW_PATTERNS", "^cmd[0-9]+$, ls")
+    _parse_allowed_patterns.cache_clear()
+
+    first = validator._get_allowed_patterns()
+    assert [pattern.pattern for pattern in first] == ["^cmd[0-9]+$", "ls"]
+    assert validator._get_allowed_patterns() is first
+
+    # A changed environment value is picked up immediately
+    monkeypatch.setenv("ALLOW_PATTERNS", "pwd")
+    assert [pattern.pattern for pattern in validator._get_allowed_patterns()] == ["pwd"]
+
+
+def test_is_command_allowed_with_patterns():
+    validator = CommandValidator(
+        env={"ALLOW_COMMANDS": "allowed_cmd", "ALLOW_PATTERNS": "^cmd[0-9]+$"}
+    )
 
     assert validator.is_command_allowed("allowed_cmd")
     assert validator.is_command_allowed("cmd123")
     assert not validator.is_command_allowed("disallowed_cmd")
     assert not validator.is_command_allowed("cmdabc")
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "allowed_cmd")
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "allowed_cmd"})
     assert validator.is_command_allowed("allowed_cmd")
     assert not validator.is_command_allowed("disallowed_cmd")
 
@@ -44,11 +80,29 @@ def test_validate_no_shell_operators(validator):
         validator.validate_no_shell_operators(";")
     with pytest.raises(ValueError, match="Unexpected shell operator"):
         validator.validate_no_shell_operators("&&")
+    for token in ["a;b", "x&&y", "x||y", "`id`", "a\nb", "|"]:
+        with pytest.raises(ValueError, match="Unexpected shell operator"):
+            validator.validate_no_shell_operators(token)
+    # Embedded single pipes and redirection characters are literal data
+    validator.validate_no_shell_operators("a|b")
+    validator.validate_no_shell_operators(">")
 
 
-def test_validate_pipeline(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "ls,grep")
+def test_validate_argv_no_shell_operators(validator):
+    # Operators cannot be formed across token boundaries
+    validator.validate_argv_no_shell_operators(["echo", "a&", "&b", "x|", "|y"])
+    validator.validate_argv_no_shell_operators([])
+
+    # The first offending token is reported
+    with pytest.raises(ValueError, match="Unexpected shell operator: x;y"):
+        validator.validate_argv_no_shell_operators(["echo", "x;y", "&&"])
+
+    with pytest.raises(ValueError, match=r"Unexpected shell operator: \|$"):
+        validator.validate_argv_no_shell_operators(["echo", "|", "cat"])
+
+
+def test_validate_pipeline():
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "ls,grep"})
 
     # Valid pipeline
     validator.validate_pipeline(["ls", "|", "grep", "test"])
@@ -62,30 +116,43 @@ def test_validate_pipeline(validator, monkeypatch):
         validator.validate_pipeline(["invalid_cmd", "|", "grep", "test"])
 
 
-def test_validate_command(validator, monkeypatch):
-    clear_env(monkeypatch)
+def test_split_pipeline():
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "ls,grep"})
 
-    # No allowed commands
-    with pytest.raises(ValueError, match="No commands are allowed"):
-        validator.validate_command(["cmd"])
+    # Segments are returned in order; embedded pipes stay literal
+    assert validator.split_pipeline(["ls", "-l", "|", "grep", "a|b"]) == [
+        ["ls", "-l"],
+        ["grep", "a|b"],
+    ]
 
-    monkeypatch.setenv("ALLOW_COMMANDS", "allowed_cmd")
+    # Separators are rejected with the pipeline-specific message
+    with pytest.raises(ValueError, match="Unexpected shell operator in pipeline: ;"):
+        validator.split_pipeline(["ls", ";", "grep", "x"])
 
-    # Empty command
-    with pytest.raises(ValueError, match="Empty command"):
-        validator.validate_command([])
 
-    # Command not allowed
-    with pytest.raises(ValueError, match="Command not allowed"):
-        validator.validate_command(["disallowed_cmd"])
+@pytest.mark.parametrize(
+    "env,command,match",
+    [
+        ({}, ["cmd"], "No commands are allowed"),
+        ({"ALLOW_COMMANDS": "allowed_cmd"}, [], "Empty command"),
+        ({"ALLOW_COMMANDS": "allowed_cmd"}, ["disallowed_cmd"], "Command not allowed"),
+    ],
+)
+def test_validate_command_rejects(env, command, match):
+    validator = CommandValidator(env=env)
+
+    with pytest.raises(ValueError, match=match):
+        validator.validate_command(command)
+
+
+def test_validate_command_allows_listed_command():
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "allowed_cmd"})
 
-    # Command allowed
     validator.validate_command(["allowed_cmd", "-arg"])  # Should not raise
 
 
-def test_allow_patterns_use_fullmatch_and_reject_unsafe_forms(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_PATTERNS", "ls")
+def test_allow_patterns_use_fullmatch_and_reject_unsafe_forms():
+    validator = CommandValidator(env={"ALLOW_PATTERNS": "ls"})
 
     assert validator.is_command_allowed("ls")
     assert not validator.is_command_allowed("lsof")
@@ -94,15 +161,14 @@ def test_allow_patterns_use_fullmatch_and_reject_unsafe_forms(validator, monkeyp
     with pytest.raises(ValueError, match="Unsafe command name"):
         validator.is_command_allowed("ls -la")
 
-    monkeypatch.setenv("ALLOW_PATTERNS", "ls;.*")
+    validator = CommandValidator(env={"ALLOW_PATTERNS": "ls;.*"})
     with pytest.raises(ValueError, match="Unsafe allowed command pattern"):
         validator.is_command_allowed("ls")
 
 
-def test_default_dangerous_exec_vectors_are_rejected(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv(
-        "ALLOW_COMMANDS", "find,sh,bash,python,python3,awk,tar,xargs,env"
+def test_default_dangerous_exec_vectors_are_rejected():
+    validator = CommandValidator(
+        env={"ALLOW_COMMANDS": "find,sh,bash,python,python3,awk,tar,xargs,env"}
     )
 
     dangerous_commands = [
@@ -127,17 +193,15 @@ def test_default_dangerous_exec_vectors_are_rejected(validator, monkeypatch):
 
 
 @pytest.mark.parametrize("command", ["python2", "python3.11", "/usr/bin/python3.11"])
-def test_versioned_python_interpreters_are_rejected(validator, monkeypatch, command):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_PATTERNS", r"(?:.*/)?python[0-9.]*")
+def test_versioned_python_interpreters_are_rejected(command):
+    validator = CommandValidator(env={"ALLOW_PATTERNS": r"(?:.*/)?python[0-9.]*"})
 
     with pytest.raises(ValueError, match="default security policy"):
         validator.validate_command([command, "-c", "print(1)"])
 
 
-def test_allow_patterns_use_fullmatch(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_PATTERNS", "ls")
+def test_allow_patterns_use_fullmatch():
+    validator = CommandValidator(env={"ALLOW_PATTERNS": "ls"})
 
     validator.validate_command(["ls"])
     with pytest.raises(ValueError, match="Command not allowed"):
@@ -148,11 +212,11 @@ def test_allow_patterns_use_fullmatch(validator, monkeypatch):
         validator.validate_command(["ls -la"])
 
 
-def test_dangerous_exec_capable_vectors_are_rejected(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv(
-        "ALLOW_COMMANDS",
-        "/usr/bin/find,/bin/sh,/bin/bash,/usr/bin/python,/usr/bin/awk,/usr/bin/tar,/usr/bin/xargs,/usr/bin/env,node,perl,ruby",
+def test_dangerous_exec_capable_vectors_are_rejected():
+    validator = CommandValidator(
+        env={
+            "ALLOW_COMMANDS": "/usr/bin/find,/bin/sh,/bin/bash,/usr/bin/python,/usr/bin/awk,/usr/bin/tar,/usr/bin/xargs,/usr/bin/env,node,perl,ruby"
+        }
     )
 
     dangerous_commands = [
@@ -197,9 +261,8 @@ def test_dangerous_exec_capable_vectors_are_rejected(validator, monkeypatch):
         ["git", "-cuser.name=Example", "status"],
     ],
 )
-def test_git_command_scoped_configs_are_rejected(validator, monkeypatch, command):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "git")
+def test_git_command_scoped_configs_are_rejected(command):
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "git"})
 
     with pytest.raises(ValueError, match="git command-scoped config"):
         validator.validate_command(command)
@@ -221,9 +284,8 @@ def test_git_command_scoped_configs_are_rejected(validator, monkeypatch, command
         ["git", "clone", "ext::sh -c id"],
     ],
 )
-def test_git_external_program_vectors_are_rejected(validator, monkeypatch, command):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "git")
+def test_git_external_program_vectors_are_rejected(command):
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "git"})
 
     with pytest.raises(ValueError, match="git external program"):
         validator.validate_command(command)
@@ -237,9 +299,8 @@ def test_git_external_program_vectors_are_rejected(validator, monkeypatch, comma
         ["git", "config", "--global", "alias.pwn", "!sh -c id"],
     ],
 )
-def test_git_persistent_config_is_rejected(validator, monkeypatch, command):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "git")
+def test_git_persistent_config_is_rejected(command):
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "git"})
 
     with pytest.raises(ValueError, match="git config"):
         validator.validate_command(command)
@@ -254,9 +315,8 @@ def test_git_persistent_config_is_rejected(validator, monkeypatch, command):
         ["bsdtar", "--to-command=sh shell.sh"],
     ],
 )
-def test_alternate_binary_names_share_default_policy(validator, monkeypatch, command):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "gfind,gawk,gtar,bsdtar")
+def test_alternate_binary_names_share_default_policy(command):
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "gfind,gawk,gtar,bsdtar"})
 
     with pytest.raises(ValueError, match="default security policy"):
         validator.validate_command(command)
@@ -273,9 +333,10 @@ def test_alternate_binary_names_share_default_policy(validator, monkeypatch, com
         ["flock", "/tmp/lock", "touch", "/tmp/marker"],
     ],
 )
-def test_command_wrappers_are_rejected(validator, monkeypatch, command):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "timeout,nice,nohup,setsid,stdbuf,flock")
+def test_command_wrappers_are_rejected(command):
+    validator = CommandValidator(
+        env={"ALLOW_COMMANDS": "timeout,nice,nohup,setsid,stdbuf,flock"}
+    )
 
     with pytest.raises(ValueError, match="default security policy"):
         validator.validate_command(command)
@@ -297,11 +358,8 @@ def test_command_wrappers_are_rejected(validator, monkeypatch, command):
         ["awk", "-f", "script.awk"],
     ],
 )
-def test_embedded_execution_and_io_vectors_are_rejected(
-    validator, monkeypatch, command
-):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "sed,find,awk")
+def test_embedded_execution_and_io_vectors_are_rejected(command):
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "sed,find,awk"})
 
     with pytest.raises(ValueError, match="default security policy"):
         validator.validate_command(command)
@@ -316,26 +374,21 @@ def test_embedded_execution_and_io_vectors_are_rejected(
         ["gawk", 'BEGIN{print "x" | "id"}'],
     ],
 )
-def test_awk_embedded_pipe_payload_is_rejected_in_original_argv_form(
-    validator, monkeypatch, command
-):
+def test_awk_embedded_pipe_payload_is_rejected_in_original_argv_form(command):
     """The awk policy inspects the original argument, pipe characters included."""
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "awk,gawk")
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "awk,gawk"})
 
     with pytest.raises(ValueError, match="awk external access"):
         validator.validate_command(command)
 
 
-def test_git_status_is_allowed(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "git")
+def test_git_status_is_allowed():
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "git"})
 
     validator.validate_command(["git", "status"])
 
 
-def test_git_subcommand_c_option_is_allowed(validator, monkeypatch):
-    clear_env(monkeypatch)
-    monkeypatch.setenv("ALLOW_COMMANDS", "git")
+def test_git_subcommand_c_option_is_allowed():
+    validator = CommandValidator(env={"ALLOW_COMMANDS": "git"})
 
     validator.validate_command(["git", "commit", "-c", "HEAD", "--dry-run"])
@@ -7,9 +7,13 @@ import pytest
 from mcp_shell_server.directory_manager import DirectoryManager
 
 
-def test_validate_directory(tmp_path):
+@pytest.fixture(scope="module")
+def manager():
+    return DirectoryManager()
+
+
+def test_validate_directory(manager, tmp_path):
     """Test directory validation."""
-    manager = DirectoryManager()
     test_dir = str(tmp_path)
 
     # Valid directory
@@ -29,16 +33,14 @@ def test_validate_directory(tmp_path):
         manager.validate_directory(nonexistent)
 
     # Not a directory (create a file)
-    test_file = os.path.join(test_dir, "test.txt")
-    with open(test_file, "w") as f:
-        f.write("test")
+    test_file = tmp_path / "test.txt"
+    test_file.touch()
     with pytest.raises(ValueError, match="Not a directory"):
-        manager.validate_directory(test_file)
+        manager.validate_directory(str(test_file))
 
 
-def test_resolve_effective_directory(monkeypatch, tmp_path):
+def test_resolve_effective_directory(manager, monkeypatch, tmp_path):
     """Optional request directories resolve relative to the server process CWD."""
-    manager = DirectoryManager()
     child = tmp_path / "child"
     child.mkdir()
     monkeypatch.chdir(tmp_path)
@@ -54,9 +56,8 @@ def test_resolve_effective_directory(monkeypatch, tmp_path):
         manager.resolve_effective_directory("  \n")
 
 
-def test_get_absolute_path(tmp_path):
+def test_get_absolute_path(manager, tmp_path):
     """Test absolute path resolution."""
-    manager = DirectoryManager()
     test_dir = str(tmp_path)
 
     # Already absolute path
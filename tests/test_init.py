@@ -1,8 +1,15 @@
 import asyncio
+import sys
+import types
 
 
 def test_main(mocker):
     """Test the main entry point"""
+    # Run without uvloop regardless of what is installed
+    mocker.patch.dict(sys.modules, {"uvloop": None})
+    # Stub the server coroutine factory so no coroutine is left unawaited
+    sentinel = object()
+    mocker.patch("mcp_shell_server.server.main", new=mocker.Mock(return_value=sentinel))
     # Mock asyncio.run
     mock_run = mocker.patch("asyncio.run")
 
@@ -12,12 +19,22 @@ def test_main(mocker):
     # Call the main function
     main()
 
-    # Verify that asyncio.run was called
-    assert mock_run.call_count == 1
-    # The first argument of the call should be a coroutine object
-    args = mock_run.call_args[0]
-    assert len(args) == 1
-    coro = args[0]
-    assert asyncio.iscoroutine(coro)
-    # Clean up the coroutine
-    coro.close()
+    # Verify that asyncio.run was called with the server entry point
+    mock_run.assert_called_once_with(sentinel)
+
+
+def test_main_uses_uvloop_when_available(mocker):
+    """Test the main entry point runs on uvloop's loop when it is installed"""
+    fake_uvloop = types.SimpleNamespace(new_event_loop=asyncio.new_event_loop)
+    mocker.patch.dict(sys.modules, {"uvloop": fake_uvloop})
+    sentinel = object()
+    mocker.patch("mcp_shell_server.server.main", new=mocker.Mock(return_value=sentinel))
+    mock_runner = mocker.patch("asyncio.Runner")
+
+    from mcp_shell_server import main
+
+    main()
+
+    mock_runner.assert_called_once_with(loop_factory=fake_uvloop.new_event_loop)
+    run = mock_runner.return_value.__enter__.return_value.run
+    run.assert_called_once_with(sentinel)
@@ -8,7 +8,11 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from mcp_shell_server.process_manager import OutputLimitExceeded, ProcessManager
+from mcp_shell_server.process_manager import (
+    OutputLimitExceeded,
+    ProcessManager,
+    _parse_env_key_list,
+)
 
 
 def create_mock_process():
@@ -118,6 +122,19 @@ async def test_create_process_filters_envs_by_allowlist(process_manager, monkeyp
     assert "PARENT_DISALLOWED" not in child_env
 
 
+def test_child_env_allowlist_is_parsed_once_per_value():
+    """The child environment allowlist is parsed once for each raw value."""
+    _parse_env_key_list.cache_clear()
+
+    first = _parse_env_key_list("TEST_VAR, PARENT_ALLOWED,")
+    second = _parse_env_key_list("TEST_VAR, PARENT_ALLOWED,")
+
+    assert first == frozenset({"TEST_VAR", "PARENT_ALLOWED"})
+    assert second is first
+    assert _parse_env_key_list.cache_info().hits == 1
+
+
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_child_process_cannot_observe_parent_secret_by_default(
     process_manager, monkeypatch
@@ -172,6 +189,7 @@ async def test_execute_with_timeout_timeout(process_manager):
             mock_proc,
             timeout=1,
         )
+    await process_manager.cleanup_processes()
 
     mock_proc.terminate.assert_called_once()
 
@@ -286,9 +304,10 @@ async def test_output_limit_is_enforced_with_mocked_communicate(process_manager)
     assert exc_info.value.stdout == b"abc"
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_execute_with_timeout_terminates_real_process(process_manager):
-    """Timed-out subprocesses are terminated and reaped promptly."""
+    """Timed-out subprocesses are terminated and reaped in the background."""
     process = await process_manager.create_process(
         [sys.executable, "-c", "import time; time.sleep(10)"],
         directory=None,
@@ -297,9 +316,15 @@ async def test_execute_with_timeout_terminates_real_process(process_manager):
     with pytest.raises(asyncio.TimeoutError):
         await process_manager.execute_with_timeout(process, timeout=0.05)
 
+    # The caller is not blocked on the reap; shutdown cleanup waits for it.
+    assert process in process_manager._reapers
+    await process_manager.cleanup_processes()
+
     assert process.returncode is not None
+    assert not process_manager._reapers
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_output_limit_terminates_real_high_output_process(process_manager):
     """High-output subprocesses are capped without buffering full output."""
@@ -316,6 +341,106 @@ async def test_output_limit_terminates_real_high_output_process(process_manager)
     assert process.returncode is not None
 
 
+@pytest.mark.xdist_group(name="subprocess")
+@pytest.mark.asyncio
+async def test_output_limit_pipeline_collects_stages_before_raising(process_manager):
+    """Capped pipelines kill every stage and drain its pipes before returning."""
+    with pytest.raises(OutputLimitExceeded):
+        await process_manager.execute_pipeline(
+            [[sys.executable, "-c", "print('x' * 1000000)"], ["cat"]],
+            timeout=5,
+            output_limit=100,
+        )
+
+    processes = list(process_manager._processes)
+    assert len(processes) == 2
+    assert not process_manager._reapers
+    assert all(process.returncode is not None for process in processes)
+    assert all(
+        process.stdout is None or process.stdout.at_eof() for process in processes
+    )
+
+
+@pytest.mark.xdist_group(name="subprocess")
+@pytest.mark.asyncio
+async def test_cancelled_reaper_still_collects_child(process_manager):
+    """Loop shutdown cancelling a reaper does not leave the child running."""
+    process = await process_manager.create_process(
+        [sys.executable, "-c", "import time; time.sleep(10)"],
+        directory=None,
+    )
+    process_manager.reap_in_background(process)
+    reaper = process_manager._reapers[process]
+
+    await asyncio.sleep(0)
+    reaper.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await reaper
+
+    assert process.returncode is not None
+
+
+@pytest.mark.xdist_group(name="subprocess")
+@pytest.mark.asyncio
+async def test_execute_pipeline_streams_real_stages(process_manager):
+    """Pipeline stages are chained through OS pipes and run concurrently."""
+    stdout, stderr, return_code = await process_manager.execute_pipeline(
+        [["cat"], ["tr", "a-z", "A-Z"]],
+        first_stdin=b"hello",
+        timeout=5,
+    )
+
+    assert stdout == b"HELLO"
+    assert stderr == b""
+    assert return_code == 0
+
+
+@pytest.mark.xdist_group(name="subprocess")
+@pytest.mark.asyncio
+async def test_execute_with_timeout_feeds_large_stdin(process_manager):
+    """Large stdin is fed while output is drained, so the exchange cannot stall."""
+    payload = b"x" * (1024 * 1024)
+    process = await process_manager.create_process(["cat"], directory=None)
+
+    stdout, stderr = await process_manager.execute_with_timeout(
+        process, stdin=payload.decode(), timeout=5
+    )
+
+    assert stdout == payload
+    assert stderr == b""
+
+
+@pytest.mark.xdist_group(name="subprocess")
+@pytest.mark.asyncio
+async def test_execute_pipeline_builds_child_env_once(process_manager):
+    """All pipeline stages share one child environment."""
+    with patch(
+        "mcp_shell_server.process_manager.build_child_environment",
+        return_value={"PATH": os.environ.get("PATH", os.defpath)},
+    ) as build_env:
+        stdout, _, return_code = await process_manager.execute_pipeline(
+            [["echo", "hi"], ["cat"], ["cat"]],
+            timeout=5,
+        )
+
+    assert stdout == b"hi\n"
+    assert return_code == 0
+    build_env.assert_called_once()
+
+
+@pytest.mark.xdist_group(name="subprocess")
+@pytest.mark.asyncio
+async def test_execute_pipeline_tolerates_sigpipe_upstream(process_manager):
+    """An endless upstream stage ends via SIGPIPE once downstream stops reading."""
+    stdout, _, return_code = await process_manager.execute_pipeline(
+        [["yes"], ["head", "-n", "1"]],
+        timeout=5,
+    )
+
+    assert stdout == b"y\n"
+    assert return_code == 0
+
+
 def test_child_environment_does_not_inherit_secrets(process_manager, monkeypatch):
     """Parent secrets are not copied unless explicitly allowlisted."""
     monkeypatch.setenv("SECRET_TOKEN", "do-not-leak")
@@ -9,6 +9,9 @@ import pytest
 
 from mcp_shell_server.process_manager import ProcessManager
 
+# Every test here is a coroutine; all share the session event loop
+pytestmark = pytest.mark.asyncio
+
 
 def create_mock_process(returncode=0):
     """Create a mock process with all required attributes."""
@@ -16,52 +19,33 @@ def create_mock_process(returncode=0):
     process.returncode = returncode
     process.communicate = AsyncMock(return_value=(b"output", b"error"))
     process.wait = AsyncMock(return_value=returncode)
-    process.terminate = MagicMock()
-    process.kill = MagicMock()
+    # terminate() and kill() are auto-created MagicMock children
     return process
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def process_manager():
-    """Fixture for ProcessManager instance."""
+    """Fixture for a ProcessManager instance shared across the module."""
     return ProcessManager()
 
 
-@pytest.mark.asyncio
-async def test_start_process_sets_is_running(process_manager):
-    """Test that start_process sets is_running attribute correctly."""
-    mock_proc = create_mock_process()
-    with patch(
-        "mcp_shell_server.process_manager.asyncio.create_subprocess_exec",
-        new_callable=AsyncMock,
-        return_value=mock_proc,
-    ):
-        # Test start_process
-        process = await process_manager.start_process(["echo", "test"])
-
-        # Verify is_running attribute is set
-        assert hasattr(process, "is_running")
-
-        # Test is_running when returncode is None (running)
-        mock_proc.returncode = None
-        assert process.is_running() is True
-
-        # Test is_running when returncode is set (finished)
-        mock_proc.returncode = 0
-        assert process.is_running() is False
+@pytest.fixture(autouse=True)
+def reset_process_manager(process_manager):
+    """Forget processes tracked by earlier tests."""
+    process_manager._processes.clear()
+    process_manager._reapers.clear()
 
 
-@pytest.mark.asyncio
-async def test_start_process_async_sets_is_running(process_manager):
-    """Test that start_process_async sets is_running attribute correctly."""
+@pytest.mark.parametrize("method", ["start_process", "start_process_async"])
+async def test_start_process_sets_is_running(process_manager, method):
+    """Test that start_process and start_process_async set is_running correctly."""
     mock_proc = create_mock_process()
     with patch(
         "mcp_shell_server.process_manager.asyncio.create_subprocess_exec",
         new_callable=AsyncMock,
         return_value=mock_proc,
     ):
-        # Test start_process_async
-        process = await process_manager.start_process_async(["echo", "test"])
+        process = await getattr(process_manager, method)(["echo", "test"])
 
         # Verify is_running attribute is set
         assert hasattr(process, "is_running")
@@ -75,7 +59,6 @@ async def test_start_process_async_sets_is_running(process_manager):
         assert process.is_running() is False
 
 
-@pytest.mark.asyncio
 async def test_cleanup_all_clears_and_kills(process_manager):
     """Test that cleanup_all kills tracked processes and clears the set."""
     # Create mock processes
@@ -105,7 +88,6 @@ async def test_cleanup_all_clears_and_kills(process_manager):
         assert len(process_manager._processes) == 0
 
 
-@pytest.mark.asyncio
 async def test_execute_with_timeout_generic_exception(process_manager):
     """Test that generic exceptions in communicate() cause process to be killed and exception re-raised."""
     mock_proc = create_mock_process()
@@ -123,11 +105,8 @@ async def test_execute_with_timeout_generic_exception(process_manager):
     mock_proc.terminate.assert_called_once()
 
 
-@pytest.mark.asyncio
-async def test_create_process_unexpected_exception():
+async def test_create_process_unexpected_exception(process_manager):
     """Test that unexpected exceptions in create_subprocess_exec are converted to ValueError."""
-    process_manager = ProcessManager()
-
     # Mock asyncio.create_subprocess_exec to raise an unexpected exception
     unexpected_error = RuntimeError("Unexpected system error")
     with patch(
@@ -142,75 +121,68 @@ async def test_create_process_unexpected_exception():
             await process_manager.create_process("echo test", directory="/tmp")
 
 
-@pytest.mark.asyncio
 async def test_execute_pipeline_last_stdout_handle(process_manager):
     """Test that execute_pipeline writes to IO handle when last_stdout is provided."""
-    # Create a runtime-valid mock IO object. typing.IO is not accepted by
-    # isinstance(..., io.IOBase) checks used by ProcessManager.
-    mock_io = MagicMock(spec=io.TextIOBase)
+    sink = io.StringIO()
 
     # Create a mock process that succeeds
     mock_proc = create_mock_process(returncode=0)
     mock_proc.communicate = AsyncMock(return_value=(b"test output", b""))
 
+    with patch.multiple(
+        process_manager,
+        create_process=AsyncMock(return_value=mock_proc),
+        execute_with_timeout=AsyncMock(return_value=(b"test output", b"")),
+        cleanup_processes=AsyncMock(),
+    ):
+        # Execute pipeline with IO handle
+        stdout, stderr, returncode = await process_manager.execute_pipeline(
+            [["echo", "test"]], last_stdout=sink
+        )
+
+    # Verify the decoded output was written to the IO handle
+    assert sink.getvalue() == "test output"
+
+    # Verify return values
+    assert stderr == b""
+    assert returncode == 0
+
+
+async def test_execute_pipeline_last_stdout_binary_handle(process_manager):
+    """Test that a binary last_stdout receives raw bytes without decoding."""
+    sink = io.BytesIO()
+    mock_proc = create_mock_process(returncode=0)
+
     with patch.object(
         process_manager,
         "create_process",
         new_callable=AsyncMock,
         return_value=mock_proc,
     ):
-        with patch.object(
-            process_manager,
-            "execute_with_timeout",
-            new_callable=AsyncMock,
-            return_value=(b"test output", b""),
-        ):
-            with patch.object(
-                process_manager, "cleanup_processes", new_callable=AsyncMock
-            ):
-
-                # Execute pipeline with IO handle
-                stdout, stderr, returncode = await process_manager.execute_pipeline(
-                    [["echo", "test"]], last_stdout=mock_io
-                )
-
-                # Verify write was called on the IO handle
-                mock_io.write.assert_called_once_with("test output")
+        with patch.object(process_manager, "cleanup_processes", new_callable=AsyncMock):
+            mock_proc.communicate = AsyncMock(return_value=(b"\xff raw", b""))
+            await process_manager.execute_pipeline([["cat", "blob"]], last_stdout=sink)
 
-                # Verify return values
-                assert stderr == b""
-                assert returncode == 0
+    assert sink.getvalue() == b"\xff raw"
 
 
-@pytest.mark.asyncio
 async def test_execute_pipeline_empty_stderr_nonzero_return(process_manager):
     """Test that execute_pipeline provides default error message when stderr is empty and returncode != 0."""
     # Create a mock process that fails with empty stderr
     mock_proc = create_mock_process(returncode=1)
     mock_proc.communicate = AsyncMock(return_value=(b"", b""))  # Empty stderr
 
-    with patch.object(
+    with patch.multiple(
         process_manager,
-        "create_process",
-        new_callable=AsyncMock,
-        return_value=mock_proc,
+        create_process=AsyncMock(return_value=mock_proc),
+        execute_with_timeout=AsyncMock(return_value=(b"", b"")),
+        cleanup_processes=AsyncMock(),
     ):
-        with patch.object(
-            process_manager,
-            "execute_with_timeout",
-            new_callable=AsyncMock,
-            return_value=(b"", b""),
-        ):
-            with patch.object(
-                process_manager, "cleanup_processes", new_callable=AsyncMock
-            ):
-
-                # Should raise ValueError with default message
-                with pytest.raises(ValueError, match="Command failed with exit code 1"):
-                    await process_manager.execute_pipeline([["failing_command"]])
+        # Should raise ValueError with default message
+        with pytest.raises(ValueError, match="Command failed with exit code 1"):
+            await process_manager.execute_pipeline([["failing_command"]])
 
 
-@pytest.mark.asyncio
 async def test_signal_handler_termination(process_manager):
     """Test that signal handler terminates tracked processes and calls os.kill."""
     if os.name != "posix":
@@ -237,12 +209,12 @@ async def test_signal_handler_termination(process_manager):
             new_process_manager = ProcessManager()
 
             # Get the registered signal handler
-            signal_handler_calls = mock_signal.call_args_list
-            sigint_handler = None
-            for call in signal_handler_calls:
-                if call[0][0] == signal.SIGINT:
-                    sigint_handler = call[0][1]
-                    break
+            handlers = {
+                call.args[0]: call.args[1]
+                for call in mock_signal.call_args_list
+                if len(call.args) >= 2
+            }
+            sigint_handler = handlers.get(signal.SIGINT)
 
             assert sigint_handler is not None, "SIGINT handler should be registered"
 
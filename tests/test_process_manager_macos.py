@@ -1,28 +1,36 @@
 # tests/test_process_manager_macos.py
 import asyncio
-import platform
+import contextlib
+import os
+import signal
 import subprocess
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+import pytest_asyncio
 
+# Collected only on macOS; see collect_ignore in conftest.py
 pytestmark = [
-    pytest.mark.skipif(
-        platform.system() != "Darwin", reason="These tests only run on macOS"
-    ),
     pytest.mark.macos,
     pytest.mark.slow,
+    pytest.mark.xdist_group(name="subprocess"),
+    # Bound the run if cleanup regresses and a sleep child hangs around
+    pytest.mark.timeout(5, method="signal"),
 ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def process_manager():
     from mcp_shell_server.process_manager import ProcessManager
 
-    pm = ProcessManager()
-    try:
-        yield pm
-    finally:
-        asyncio.run(pm.cleanup_all())
+    return ProcessManager()
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_process_manager(process_manager):
+    """Clean up the processes each test started on the shared manager."""
+    yield
+    await process_manager.cleanup_all()
 
 
 def get_process_status(pid: int) -> str:
@@ -36,6 +44,23 @@ def get_process_status(pid: int) -> str:
         return ""
 
 
+def get_child_pids(pid: int) -> list[int]:
+    """Get the PIDs of a process's direct children using pgrep."""
+    ps = subprocess.run(["pgrep", "-P", str(pid)], capture_output=True, text=True)
+    return [int(child) for child in ps.stdout.split()]
+
+
+async def wait_until(predicate, timeout: float = 2.0, interval: float = 0.01) -> bool:
+    """Poll predicate until it is truthy or timeout elapses."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+
 @pytest.mark.asyncio
 async def test_zombie_process_cleanup(process_manager):
     """Test that background processes don't become zombies."""
@@ -43,7 +68,7 @@ async def test_zombie_process_cleanup(process_manager):
     process = await process_manager.start_process(cmd)
 
     # Wait for the background process to finish
-    await asyncio.sleep(1)
+    await asyncio.wait_for(process.wait(), timeout=2.0)
 
     # Get process status
     status = get_process_status(process.pid)
@@ -88,37 +113,35 @@ async def test_process_timeout(process_manager):
 @pytest.mark.asyncio
 async def test_multiple_process_cleanup(process_manager):
     """Test cleanup of multiple processes."""
-    # Start multiple background processes
-    # Start multiple processes in parallel
-    processes = await asyncio.gather(
-        *[process_manager.start_process(["sleep", "2"]) for _ in range(3)]
-    )
-
-    # Give them a moment to start
-    await asyncio.sleep(0.1)
+    # One real child proves the kill; a second tracked process only needs to
+    # observe that cleanup reaches every entry, so it does not spawn.
+    process = await process_manager.start_process(["sleep", "2"])
+    tracked = MagicMock()
+    tracked.returncode = None
+    tracked.wait = AsyncMock(return_value=0)
+    process_manager._processes.add(tracked)
 
     try:
-        # Verify they're all running
-        assert all(p.is_running() for p in processes)
+        # Verify the real process is running
+        assert process.is_running()
 
         # Cleanup
         await process_manager.cleanup_all()
+        tracked.terminate.assert_called_once()
 
-        # Give cleanup a moment to complete
-        await asyncio.sleep(0.1)
+        # Wait for cleanup to complete
+        await wait_until(lambda: get_process_status(process.pid) == "")
 
-        # Verify all processes are gone
-        for p in processes:
-            status = get_process_status(p.pid)
-            assert status == "", f"Process {p.pid} still exists with status: {status}"
+        # Verify the real process is gone
+        status = get_process_status(process.pid)
+        assert status == "", f"Process {process.pid} still exists with status: {status}"
     finally:
         # Ensure cleanup in case of test failure
-        for p in processes:
-            if p.returncode is None:
-                try:
-                    p.kill()
-                except ProcessLookupError:
-                    pass
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
 
 
 @pytest.mark.asyncio
@@ -127,16 +150,23 @@ async def test_process_group_termination(process_manager):
     # Create a process that spawns children
     cmd = ["sh", "-c", "sleep 10 & sleep 10 & sleep 10 & wait"]
     process = await process_manager.start_process(cmd)
+    children: list[int] = []
 
     try:
-        # Give processes time to start
-        await asyncio.sleep(0.5)
+        # Wait for the children to start
+        await wait_until(lambda: len(get_child_pids(process.pid)) == 3)
+        children = get_child_pids(process.pid)
 
         # Kill the main process
         process.kill()
 
-        # Wait a moment for cleanup
-        await asyncio.sleep(0.5)
+        # Wait for the group to exit
+        await wait_until(
+            lambda: subprocess.run(
+                ["pgrep", "-g", str(process.pid)], capture_output=True
+            ).returncode
+            != 0
+        )
 
         # Check if any processes from the group remain
         ps = subprocess.run(["pgrep", "-g", str(process.pid)], capture_output=True)
@@ -147,3 +177,8 @@ async def test_process_group_termination(process_manager):
                 process.kill()
             except ProcessLookupError:
                 pass
+        # Orphaned children would keep the stdout pipe open past the test
+        for pid in children:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGKILL)
+        await process.wait()
@@ -2,10 +2,12 @@ import asyncio
 import os
 import signal
 import tempfile
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from mcp.types import TextContent, Tool
 
+from mcp_shell_server.process_manager import ProcessManager
 from mcp_shell_server.server import call_tool, list_tools
 
 
@@ -41,51 +43,99 @@ class MockProcess:
         pass
 
 
-def setup_mock_subprocess(monkeypatch):
-    """Set up mock subprocess to avoid interactive shell warnings"""
+# Canned (stdout, stderr, returncode) for commands whose output never varies
+MOCK_COMMAND_RESPONSES = {
+    "echo": (b"hello world\n", b"", 0),
+    "ps": (b"bash\n", b"", 0),
+    "env": (b"TEST_ENV=value\n", b"", 0),
+    "sleep": (b"", b"", 0),
+}
 
-    async def mock_create_subprocess_exec(
-        *argv,
-        stdin=None,
-        stdout=None,
-        stderr=None,
-        env=None,
-        cwd=None,
-    ):
-        # Return appropriate output based on argv command execution.
-        if "echo" in argv:
-            return MockProcess(stdout=b"hello world\n", stderr=b"", returncode=0)
-        elif "pwd" in argv:
-            return MockProcess(stdout=cwd.encode() + b"\n", stderr=b"", returncode=0)
-        elif "cat" in argv:
-            return MockProcess(
-                stdout=None, stderr=b"", returncode=0
-            )  # Will echo back stdin
-        elif "ps" in argv:
-            return MockProcess(stdout=b"bash\n", stderr=b"", returncode=0)
-        elif "env" in argv:
-            return MockProcess(stdout=b"TEST_ENV=value\n", stderr=b"", returncode=0)
-        elif "sleep" in argv:
-            return MockProcess(stdout=b"", stderr=b"", returncode=0)
-        else:
-            return MockProcess(stdout=b"", stderr=b"", returncode=0)
 
-    monkeypatch.setattr(asyncio, "create_subprocess_exec", mock_create_subprocess_exec)
+def _mock_pwd(argv, cwd):
+    return MockProcess(stdout=cwd.encode() + b"\n", stderr=b"", returncode=0)
 
 
-@pytest.fixture
-def temp_test_dir():
-    """Create a temporary directory for testing"""
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        # Return the real path to handle macOS /private/tmp symlink
-        yield os.path.realpath(tmpdirname)
+def _mock_cat(argv, cwd):
+    if len(argv) == 1:
+        return MockProcess(stdout=None, stderr=b"", returncode=0)  # Echoes stdin
+    # File arguments get a canned payload; tests assert on argv and cwd instead
+    return MockProcess(stdout=b"file contents\n", stderr=b"", returncode=0)
+
+
+def _mock_ls(argv, cwd):
+    listing = "".join(f"{name}\n" for name in sorted(os.listdir(cwd)))
+    return MockProcess(stdout=listing.encode(), stderr=b"", returncode=0)
+
+
+# Commands whose output depends on argv or the working directory
+MOCK_COMMAND_HANDLERS = {"pwd": _mock_pwd, "cat": _mock_cat, "ls": _mock_ls}
+
+
+async def mock_create_subprocess_exec(
+    *argv,
+    stdin=None,
+    stdout=None,
+    stderr=None,
+    env=None,
+    cwd=None,
+):
+    """Return appropriate output for the command named by argv[0]."""
+    handler = MOCK_COMMAND_HANDLERS.get(argv[0])
+    if handler is not None:
+        return handler(argv, cwd)
+    out, err, returncode = MOCK_COMMAND_RESPONSES.get(argv[0], (b"", b"", 0))
+    return MockProcess(stdout=out, stderr=err, returncode=returncode)
+
+
+def _write_file(path, data: bytes):
+    """Create or truncate path and write data without a buffered file object."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+@pytest.fixture(autouse=True)
+def mock_subprocess(request, monkeypatch):
+    """Serve commands from MockProcess unless a test is marked real_subprocess"""
+    if "real_subprocess" in request.keywords:
+        return None
+    create_subprocess_exec = AsyncMock(side_effect=mock_create_subprocess_exec)
+    monkeypatch.setattr(
+        "mcp_shell_server.process_manager.asyncio.create_subprocess_exec",
+        create_subprocess_exec,
+    )
+    return create_subprocess_exec
+
+
+@pytest.fixture(scope="module")
+def temp_test_dir(tmp_path_factory):
+    """Create a temporary directory shared by the tests in this module"""
+    # Return the real path to handle macOS /private/tmp symlink
+    return os.path.realpath(tmp_path_factory.mktemp("shell_tests"))
 
 
 @pytest.mark.asyncio
 async def test_list_tools():
     """Test listing of available tools"""
+    tools = await list_tools()
+    assert len(tools) == 1
+    tool = tools[0]
+    assert isinstance(tool, Tool)
+    assert tool.name == "shell_execute"
+    assert tool.description
+    assert tool.inputSchema["type"] == "object"
+    assert "command" in tool.inputSchema["properties"]
+    assert "stdin" in tool.inputSchema["properties"]
+    assert "directory" in tool.inputSchema["properties"]
+    assert tool.inputSchema["required"] == ["command"]
 
 
+@pytest.mark.slow
+@pytest.mark.real_subprocess
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_tool_execution_timeout(monkeypatch):
     """Test tool execution with timeout"""
@@ -99,17 +149,6 @@ async def test_tool_execution_timeout(monkeypatch):
                 "timeout": 1,
             },
         )
-    tools = await list_tools()
-    assert len(tools) == 1
-    tool = tools[0]
-    assert isinstance(tool, Tool)
-    assert tool.name == "shell_execute"
-    assert tool.description
-    assert tool.inputSchema["type"] == "object"
-    assert "command" in tool.inputSchema["properties"]
-    assert "stdin" in tool.inputSchema["properties"]
-    assert "directory" in tool.inputSchema["properties"]
-    assert tool.inputSchema["required"] == ["command"]
 
 
 @pytest.mark.asyncio
@@ -129,7 +168,6 @@ async def test_call_tool_valid_command(monkeypatch, temp_test_dir):
 @pytest.mark.asyncio
 async def test_call_tool_with_stdin(monkeypatch, temp_test_dir):
     """Test command execution with stdin"""
-    setup_mock_subprocess(monkeypatch)
     monkeypatch.setenv("ALLOW_COMMANDS", "cat")
     result = await call_tool(
         "shell_execute",
@@ -141,40 +179,57 @@ async def test_call_tool_with_stdin(monkeypatch, temp_test_dir):
     assert result[0].text.strip() == "test input"
 
 
-@pytest.mark.asyncio
-async def test_call_tool_invalid_command(monkeypatch, temp_test_dir):
-    """Test execution of an invalid command"""
-    monkeypatch.setenv("ALLOW_COMMANDS", "echo")
-    with pytest.raises(RuntimeError) as excinfo:
-        await call_tool(
+@pytest.mark.parametrize(
+    "allow_commands,name,arguments,expected",
+    [
+        (
+            "echo",
             "shell_execute",
-            {"command": ["invalid_command"], "directory": temp_test_dir},
-        )
-    assert "Command not allowed: invalid_command" in str(excinfo.value)
-
-
-@pytest.mark.asyncio
-async def test_call_tool_unknown_tool():
-    """Test calling an unknown tool"""
-    with pytest.raises(RuntimeError) as excinfo:
-        await call_tool("unknown_tool", {})
-    assert "Unknown tool: unknown_tool" in str(excinfo.value)
-
-
-@pytest.mark.asyncio
-async def test_call_tool_invalid_arguments():
-    """Test calling a tool with invalid arguments"""
-    with pytest.raises(RuntimeError) as excinfo:
-        await call_tool("shell_execute", "not a dict")
-    assert "Arguments must be a dictionary" in str(excinfo.value)
-
-
+            {"command": ["invalid_command"], "directory": "/tmp"},
+            "Command not allowed: invalid_command",
+        ),
+        (None, "unknown_tool", {}, "Unknown tool: unknown_tool"),
+        (None, "shell_execute", "not a dict", "Arguments must be a dictionary"),
+        (None, "shell_execute", {"command": []}, "No command provided"),
+        (
+            "ls",
+            "shell_execute",
+            {"command": ["ls"], "directory": "/nonexistent/directory"},
+            "Directory does not exist: /nonexistent/directory",
+        ),
+        (
+            None,
+            "shell_execute",
+            {"command": "not_an_array", "directory": "/tmp"},
+            "'command' must be an array",
+        ),
+        (
+            "ls",
+            "shell_execute",
+            {"command": ["sudo", "reboot"], "directory": "/tmp"},
+            "Command not allowed: sudo",
+        ),
+    ],
+    ids=[
+        "invalid_command",
+        "unknown_tool",
+        "invalid_arguments",
+        "empty_command",
+        "nonexistent_directory",
+        "command_not_array",
+        "disallowed_command",
+    ],
+)
 @pytest.mark.asyncio
-async def test_call_tool_empty_command():
-    """Test execution with empty command"""
+async def test_call_tool_rejects_bad_input(
+    monkeypatch, allow_commands, name, arguments, expected
+):
+    """Invalid tool calls surface their validation error"""
+    if allow_commands is not None:
+        monkeypatch.setenv("ALLOW_COMMANDS", allow_commands)
     with pytest.raises(RuntimeError) as excinfo:
-        await call_tool("shell_execute", {"command": []})
-    assert "No command provided" in str(excinfo.value)
+        await call_tool(name, arguments)
+    assert expected in str(excinfo.value)
 
 
 # New tests for directory functionality
@@ -192,50 +247,43 @@ async def test_call_tool_with_directory(temp_test_dir, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_call_tool_with_file_operations(temp_test_dir, monkeypatch):
+async def test_call_tool_with_file_operations(
+    temp_test_dir, monkeypatch, mock_subprocess
+):
     """Test file operations in a specific directory"""
     monkeypatch.setenv("ALLOW_COMMANDS", "ls,cat")
+    work_dir = tempfile.mkdtemp(dir=temp_test_dir)
 
     # Create a test file
-    test_file = os.path.join(temp_test_dir, "test.txt")
-    with open(test_file, "w") as f:
-        f.write("test content")
+    test_file = os.path.join(work_dir, "test.txt")
+    _write_file(test_file, b"test content")
 
     # Test ls command
     result = await call_tool(
-        "shell_execute", {"command": ["ls"], "directory": temp_test_dir}
+        "shell_execute", {"command": ["ls"], "directory": work_dir}
     )
     assert isinstance(result[0], TextContent)
     assert "test.txt" in result[0].text
 
     # Test cat command
     result = await call_tool(
-        "shell_execute", {"command": ["cat", "test.txt"], "directory": temp_test_dir}
+        "shell_execute", {"command": ["cat", "test.txt"], "directory": work_dir}
     )
     assert isinstance(result[0], TextContent)
-    assert result[0].text.strip() == "test content"
-
-
-@pytest.mark.asyncio
-async def test_call_tool_with_nonexistent_directory(monkeypatch):
-    """Test command execution with a non-existent directory"""
-    monkeypatch.setenv("ALLOW_COMMANDS", "ls")
-    with pytest.raises(RuntimeError) as excinfo:
-        await call_tool(
-            "shell_execute", {"command": ["ls"], "directory": "/nonexistent/directory"}
-        )
-    assert "Directory does not exist: /nonexistent/directory" in str(excinfo.value)
+    assert result[0].text.strip() == "file contents"
+    assert mock_subprocess.call_args.args == ("cat", "test.txt")
+    assert mock_subprocess.call_args.kwargs["cwd"] == work_dir
 
 
 @pytest.mark.asyncio
 async def test_call_tool_with_file_as_directory(temp_test_dir, monkeypatch):
     """Test command execution with a file specified as directory"""
     monkeypatch.setenv("ALLOW_COMMANDS", "ls")
+    work_dir = tempfile.mkdtemp(dir=temp_test_dir)
 
     # Create a test file
-    test_file = os.path.join(temp_test_dir, "test.txt")
-    with open(test_file, "w") as f:
-        f.write("test content")
+    test_file = os.path.join(work_dir, "test.txt")
+    _write_file(test_file, b"test content")
 
     with pytest.raises(RuntimeError) as excinfo:
         await call_tool("shell_execute", {"command": ["ls"], "directory": test_file})
@@ -248,7 +296,7 @@ async def test_call_tool_with_nested_directory(temp_test_dir, monkeypatch):
     monkeypatch.setenv("ALLOW_COMMANDS", "pwd,mkdir")
 
     # Create a nested directory
-    nested_dir = os.path.join(temp_test_dir, "nested")
+    nested_dir = os.path.join(tempfile.mkdtemp(dir=temp_test_dir), "nested")
     os.mkdir(nested_dir)
     nested_real_path = os.path.realpath(nested_dir)
 
@@ -263,9 +311,24 @@ async def test_call_tool_with_nested_directory(temp_test_dir, monkeypatch):
 async def test_call_tool_with_timeout(monkeypatch):
     """Test command execution with timeout"""
     monkeypatch.setenv("ALLOW_COMMANDS", "sleep")
+    # test_tool_execution_timeout covers a real deadline; here the still-running
+    # child times out at once so only the error plumbing is exercised
+    process = MockProcess(returncode=None)
+    monkeypatch.setattr(
+        asyncio, "create_subprocess_exec", AsyncMock(return_value=process)
+    )
+    monkeypatch.setattr(
+        ProcessManager,
+        "execute_with_timeout",
+        AsyncMock(side_effect=asyncio.TimeoutError),
+    )
+    reap = MagicMock()
+    monkeypatch.setattr(ProcessManager, "reap_in_background", reap)
+
     with pytest.raises(RuntimeError) as excinfo:
         await call_tool("shell_execute", {"command": ["sleep", "2"], "timeout": 1})
     assert "Command timed out after 1 seconds" in str(excinfo.value)
+    reap.assert_called_with(process)
 
 
 @pytest.mark.asyncio
@@ -276,32 +339,6 @@ async def test_call_tool_completes_within_timeout(monkeypatch):
     assert len(result) == 0  # sleep command produces no output
 
 
-@pytest.mark.asyncio
-async def test_invalid_command_parameter():
-    """Test error handling for invalid command parameter"""
-    with pytest.raises(RuntimeError) as exc:  # Changed from ValueError to RuntimeError
-        await call_tool(
-            "shell_execute",
-            {"command": "not_an_array", "directory": "/tmp"},  # Should be an array
-        )
-    assert "'command' must be an array" in str(exc.value)
-
-
-@pytest.mark.asyncio
-async def test_disallowed_command(monkeypatch):
-    """Test error handling for disallowed command"""
-    monkeypatch.setenv("ALLOW_COMMANDS", "ls")  # Add allowed command
-    with pytest.raises(RuntimeError) as exc:
-        await call_tool(
-            "shell_execute",
-            {
-                "command": ["sudo", "reboot"],  # Not in allowed commands
-                "directory": "/tmp",
-            },
-        )
-    assert "Command not allowed: sudo" in str(exc.value)
-
-
 @pytest.mark.asyncio
 async def test_call_tool_with_stderr(monkeypatch):
     """Test command execution with stderr output"""
@@ -333,25 +370,30 @@ async def test_call_tool_with_stderr(monkeypatch):
     assert stderr_content.type == "text"
 
 
-@pytest.mark.asyncio
-async def test_main_server(mocker):
-    """Test the main server function"""
-    # Mock the stdio_server
-    mock_read_stream = mocker.AsyncMock()
-    mock_write_stream = mocker.AsyncMock()
+@pytest.fixture(scope="module")
+def stdio_streams():
+    """Build the stdio stream and context manager mocks once per module"""
+    read_stream = AsyncMock()
+    write_stream = AsyncMock()
+    context_manager = AsyncMock()
+    context_manager.__aenter__ = AsyncMock(return_value=(read_stream, write_stream))
+    context_manager.__aexit__ = AsyncMock(return_value=None)
+    return read_stream, write_stream, context_manager
 
-    # Create an async context manager mock
-    context_manager = mocker.AsyncMock()
-    context_manager.__aenter__ = mocker.AsyncMock(
-        return_value=(mock_read_stream, mock_write_stream)
-    )
-    context_manager.__aexit__ = mocker.AsyncMock(return_value=None)
 
-    # Set up stdio_server mock to return a regular function that returns the context manager
-    def stdio_server_impl():
-        return context_manager
+@pytest.fixture
+def mock_stdio_server(stdio_streams, mocker):
+    """Patch stdio_server to hand out the shared streams with fresh call records"""
+    _, _, context_manager = stdio_streams
+    context_manager.__aenter__.reset_mock()
+    context_manager.__aexit__.reset_mock()
+    return mocker.patch("mcp.server.stdio.stdio_server", return_value=context_manager)
+
 
-    mock_stdio_server = mocker.Mock(side_effect=stdio_server_impl)
+@pytest.mark.asyncio
+async def test_main_server(mocker, stdio_streams, mock_stdio_server):
+    """Test the main server function"""
+    mock_read_stream, mock_write_stream, context_manager = stdio_streams
 
     # Mock app.run and create_initialization_options
     mock_server_run = mocker.patch("mcp_shell_server.server.app.run")
@@ -363,7 +405,6 @@ async def test_main_server(mocker):
     from mcp_shell_server.server import main
 
     # Execute main function
-    mocker.patch("mcp.server.stdio.stdio_server", mock_stdio_server)
     await main()
 
     # Verify interactions
@@ -376,30 +417,17 @@ async def test_main_server(mocker):
 
 
 @pytest.mark.asyncio
-async def test_main_server_error_handling(mocker):
+async def test_main_server_error_handling(mocker, mock_stdio_server):
     """Test error handling in the main server function"""
     # Mock app.run to raise an exception
     mocker.patch(
         "mcp_shell_server.server.app.run", side_effect=RuntimeError("Test error")
     )
 
-    # Mock the stdio_server
-    context_manager = mocker.AsyncMock()
-    context_manager.__aenter__ = mocker.AsyncMock(
-        return_value=(mocker.AsyncMock(), mocker.AsyncMock())
-    )
-    context_manager.__aexit__ = mocker.AsyncMock(return_value=None)
-
-    def stdio_server_impl():
-        return context_manager
-
-    mock_stdio_server = mocker.Mock(side_effect=stdio_server_impl)
-
     # Import main after setting up mocks
     from mcp_shell_server.server import main
 
     # Execute main function and expect it to raise the error
-    mocker.patch("mcp.server.stdio.stdio_server", mock_stdio_server)
     with pytest.raises(RuntimeError) as exc:
         await main()
 
@@ -409,7 +437,6 @@ async def test_main_server_error_handling(mocker):
 @pytest.mark.asyncio
 async def test_shell_startup(monkeypatch, temp_test_dir):
     """Test shell startup and environment"""
-    setup_mock_subprocess(monkeypatch)
     monkeypatch.setenv("ALLOW_COMMANDS", "ps")
     result = await call_tool(
         "shell_execute",
@@ -422,7 +449,6 @@ async def test_shell_startup(monkeypatch, temp_test_dir):
 @pytest.mark.asyncio
 async def test_environment_variables(monkeypatch, temp_test_dir):
     """The default security policy rejects env even when allowlisted."""
-    setup_mock_subprocess(monkeypatch)
     monkeypatch.setenv("ALLOW_COMMANDS", "env")
     with pytest.raises(
         RuntimeError, match="Command rejected by default security policy: env"
@@ -5,6 +5,17 @@ from unittest.mock import AsyncMock
 import pytest
 
 from mcp_shell_server.server import ExecuteToolHandler
+from mcp_shell_server.shell_executor import ShellExecutor
+
+
+@pytest.fixture
+def stub_execute(monkeypatch):
+    """Replace ShellExecutor.execute with an AsyncMock reporting success."""
+    execute = AsyncMock(
+        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
+    )
+    monkeypatch.setattr(ShellExecutor, "execute", execute)
+    return execute
 
 
 @pytest.mark.asyncio
@@ -26,17 +37,16 @@ async def test_server_input_validation():
 
 
 @pytest.mark.asyncio
-async def test_server_omitted_directory_resolves_to_process_cwd(monkeypatch, tmp_path):
+async def test_server_omitted_directory_resolves_to_process_cwd(
+    monkeypatch, tmp_path, stub_execute
+):
     """Omitting directory uses the MCP server process current working directory."""
     monkeypatch.chdir(tmp_path)
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     await handler.run_tool({"command": ["echo", "ok"]})
 
-    handler.executor.execute.assert_awaited_once_with(
+    stub_execute.assert_awaited_once_with(
         ["echo", "ok"],
         str(tmp_path),
         None,
@@ -47,20 +57,17 @@ async def test_server_omitted_directory_resolves_to_process_cwd(monkeypatch, tmp
 
 @pytest.mark.asyncio
 async def test_server_relative_directory_resolves_from_process_cwd(
-    monkeypatch, tmp_path
+    monkeypatch, tmp_path, stub_execute
 ):
     """Relative directory inputs are resolved from the server process CWD."""
     child = tmp_path / "child"
     child.mkdir()
     monkeypatch.chdir(tmp_path)
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     await handler.run_tool({"command": ["echo", "ok"], "directory": "child"})
 
-    handler.executor.execute.assert_awaited_once_with(
+    stub_execute.assert_awaited_once_with(
         ["echo", "ok"],
         os.path.abspath("child"),
         None,
@@ -70,16 +77,13 @@ async def test_server_relative_directory_resolves_from_process_cwd(
 
 
 @pytest.mark.asyncio
-async def test_server_absolute_directory_is_passed_through(tmp_path):
+async def test_server_absolute_directory_is_passed_through(tmp_path, stub_execute):
     """Absolute directory inputs keep the existing validated behavior."""
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     await handler.run_tool({"command": ["echo", "ok"], "directory": str(tmp_path)})
 
-    handler.executor.execute.assert_awaited_once_with(
+    stub_execute.assert_awaited_once_with(
         ["echo", "ok"],
         str(tmp_path),
         None,
@@ -89,35 +93,33 @@ async def test_server_absolute_directory_is_passed_through(tmp_path):
 
 
 @pytest.mark.asyncio
-async def test_server_rejects_missing_effective_directory_before_execution(tmp_path):
+async def test_server_rejects_missing_effective_directory_before_execution(
+    tmp_path, stub_execute
+):
     """Nonexistent relative directories fail before subprocess execution."""
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     with pytest.raises(ValueError, match="Directory does not exist"):
         await handler.run_tool(
             {"command": ["echo", "ok"], "directory": str(tmp_path / "missing")}
         )
 
-    handler.executor.execute.assert_not_awaited()
+    stub_execute.assert_not_awaited()
 
 
 @pytest.mark.asyncio
-async def test_server_applies_default_timeout_and_output_limit(monkeypatch):
+async def test_server_applies_default_timeout_and_output_limit(
+    monkeypatch, stub_execute
+):
     monkeypatch.setenv("MCP_SHELL_DEFAULT_TIMEOUT_SECONDS", "7")
     monkeypatch.setenv("MCP_SHELL_MAX_TIMEOUT_SECONDS", "30")
     monkeypatch.setenv("MCP_SHELL_OUTPUT_LIMIT_BYTES", "1234")
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     result = await handler.run_tool({"command": ["echo", "ok"], "directory": "/tmp"})
 
     assert result[0].text == "ok"
-    handler.executor.execute.assert_awaited_once_with(
+    stub_execute.assert_awaited_once_with(
         ["echo", "ok"],
         "/tmp",
         None,
@@ -127,34 +129,28 @@ async def test_server_applies_default_timeout_and_output_limit(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_server_clamps_requested_timeout(monkeypatch):
+async def test_server_clamps_requested_timeout(monkeypatch, stub_execute):
     monkeypatch.setenv("MCP_SHELL_DEFAULT_TIMEOUT_SECONDS", "7")
     monkeypatch.setenv("MCP_SHELL_MAX_TIMEOUT_SECONDS", "9")
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     await handler.run_tool(
         {"command": ["echo", "ok"], "directory": "/tmp", "timeout": 999}
     )
 
-    assert handler.executor.execute.await_args.args[3] == 9
+    assert stub_execute.await_args.args[3] == 9
 
 
 @pytest.mark.asyncio
-async def test_server_rejects_boolean_timeout():
+async def test_server_rejects_boolean_timeout(stub_execute):
     handler = ExecuteToolHandler()
-    handler.executor.execute = AsyncMock(
-        return_value={"error": None, "stdout": "ok", "stderr": "", "status": 0}
-    )
 
     with pytest.raises(ValueError, match="'timeout' must be an integer"):
         await handler.run_tool(
             {"command": ["echo", "ok"], "directory": "/tmp", "timeout": True}
         )
 
-    handler.executor.execute.assert_not_awaited()
+    stub_execute.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -170,7 +166,7 @@ async def test_server_applies_default_timeout(monkeypatch, tmp_path):
         captured["output_limit"] = kwargs["output_limit"]
         return {"error": None, "stdout": "ok", "stderr": "", "status": 0}
 
-    monkeypatch.setattr(handler.executor, "execute", fake_execute)
+    monkeypatch.setattr(ShellExecutor, "execute", staticmethod(fake_execute))
 
     await handler.run_tool({"command": ["echo", "ok"], "directory": str(tmp_path)})
 
@@ -190,7 +186,7 @@ async def test_server_clamps_over_limit_timeout(monkeypatch, tmp_path):
         captured["timeout"] = timeout
         return {"error": None, "stdout": "ok", "stderr": "", "status": 0}
 
-    monkeypatch.setattr(handler.executor, "execute", fake_execute)
+    monkeypatch.setattr(ShellExecutor, "execute", staticmethod(fake_execute))
 
     await handler.run_tool(
         {"command": ["echo", "ok"], "directory": str(tmp_path), "timeout": 99}
@@ -199,6 +195,7 @@ async def test_server_clamps_over_limit_timeout(monkeypatch, tmp_path):
     assert captured["timeout"] == 11
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_audit_logging_success_and_redaction(tmp_path, monkeypatch, caplog):
     """Successful command emits structured audit fields and redacts secrets."""
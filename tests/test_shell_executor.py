@@ -1,3 +1,4 @@
+import asyncio
 import io
 import logging
 import os
@@ -140,6 +141,50 @@ async def test_basic_command_execution(
     assert result["status"] == 0
 
 
+@pytest.mark.asyncio
+async def test_binary_command_execution(
+    shell_executor_with_mock,
+    mock_process_manager,
+    temp_test_dir,
+    monkeypatch,
+):
+    """Test binary mode returns raw output bytes without decoding"""
+    clear_env(monkeypatch)
+    monkeypatch.setenv("ALLOW_COMMANDS", "cat")
+    mock_process = AsyncMock()
+    mock_process.returncode = 0
+    mock_process_manager.create_process.return_value = mock_process
+    mock_process_manager.execute_with_timeout.return_value = (b"\xff\xfe\n", b"")
+
+    result = await shell_executor_with_mock.execute(
+        ["cat", "image.bin"], temp_test_dir, binary=True
+    )
+    assert result["stdout"] == b"\xff\xfe\n"
+    assert result["stderr"] == b""
+    assert result["status"] == 0
+
+
+@pytest.mark.asyncio
+async def test_plain_command_skips_redirect_setup(
+    shell_executor_with_mock,
+    mock_process_manager,
+    temp_test_dir,
+    monkeypatch,
+    mocker,
+):
+    clear_env(monkeypatch)
+    monkeypatch.setenv("ALLOW_COMMANDS", "echo")
+    setup_redirects = mocker.spy(shell_executor_with_mock.io_handler, "setup_redirects")
+    mock_process_manager.execute_with_timeout.return_value = (b"hello\n", b"")
+
+    result = await shell_executor_with_mock.execute(["echo", "hello"], temp_test_dir)
+
+    assert result["status"] == 0
+    setup_redirects.assert_not_called()
+    spawn_kwargs = mock_process_manager.create_process.await_args.kwargs
+    assert spawn_kwargs["stdout_handle"] == asyncio.subprocess.PIPE
+
+
 @pytest.mark.asyncio
 async def test_stdin_input(
     shell_executor_with_mock,
@@ -616,6 +661,31 @@ async def test_input_redirection(
     assert result["stdout"].strip() == "test content"
 
 
+@pytest.mark.asyncio
+async def test_input_redirection_hands_file_to_child(
+    shell_executor_with_mock,
+    mock_process_manager,
+    temp_test_dir,
+    monkeypatch,
+):
+    """Test the input file is passed to the child instead of read into memory"""
+    clear_env(monkeypatch)
+    monkeypatch.setenv("ALLOW_COMMANDS", "cat")
+    with open(os.path.join(temp_test_dir, "in.txt"), "w") as f:
+        f.write("test content")
+
+    mock_process_manager.execute_with_timeout.return_value = (b"test content", b"")
+    result = await shell_executor_with_mock.execute(
+        ["cat", "<", "in.txt"], directory=temp_test_dir, stdin="ignored"
+    )
+
+    assert result["error"] is None
+    stdin_handle = mock_process_manager.create_process.call_args.kwargs["stdin_handle"]
+    assert stdin_handle.name == os.path.join(os.path.realpath(temp_test_dir), "in.txt")
+    assert stdin_handle.closed
+    assert mock_process_manager.execute_with_timeout.call_args.kwargs["stdin"] is None
+
+
 @pytest.mark.asyncio
 async def test_combined_redirections(
     shell_executor_with_mock,
@@ -809,6 +879,14 @@ def test_create_shell_command(shell_executor_with_mock):
         == "echo 'hello;' world"
     )
 
+    # Test surrounding whitespace is preserved rather than stripped
+    assert (
+        shell_executor_with_mock.preprocessor.create_shell_command(
+            ["echo", "a ", "--opt=x:y@z"]
+        )
+        == "echo 'a ' --opt=x:y@z"
+    )
+
     # Test empty command
     assert shell_executor_with_mock.preprocessor.create_shell_command([]) == ""
 
@@ -850,10 +928,36 @@ def test_preprocess_command(shell_executor_with_mock):
         "ls",
     ]
 
+    # Test argv is passed through without scanning or copying tokens
+    command = ["grep", "-E", "a|b"]
+    assert shell_executor_with_mock.preprocessor.preprocess_command(command) is command
+
     # Test empty command
     assert shell_executor_with_mock.preprocessor.preprocess_command([]) == []
 
 
+def test_clean_command_reports_operators(shell_executor_with_mock):
+    """Test that cleaning records pipe and redirection operators"""
+    cleaned = shell_executor_with_mock.preprocessor.clean_command(
+        ["echo", "", "hello", "|", "cat", ">", "out.txt"]
+    )
+    assert cleaned.tokens == ["echo", "hello", "|", "cat", ">", "out.txt"]
+    assert cleaned.has_pipe
+    assert cleaned.has_redirect
+
+    # A pipe character inside an argument is literal data, not pipeline syntax
+    cleaned = shell_executor_with_mock.preprocessor.clean_command(["grep", "a|b"])
+    assert cleaned.tokens == ["grep", "a|b"]
+    assert not cleaned.has_pipe
+    assert not cleaned.has_redirect
+
+    # Without empty tokens the input list is reused rather than rebuilt
+    command = ["echo", "hello"]
+    assert (
+        shell_executor_with_mock.preprocessor.clean_command(command).tokens is command
+    )
+
+
 def test_validate_pipeline(shell_executor_with_mock, monkeypatch):
     """Test pipeline validation"""
     clear_env(monkeypatch)
@@ -906,6 +1010,12 @@ def test_redirection_path_validation(shell_executor_with_mock):
             ["echo", "hello", ">", ">>", "file.txt"]
         )
 
+    # Test operator directly after input redirection
+    with pytest.raises(ValueError, match="consecutive operators"):
+        shell_executor_with_mock.preprocessor.parse_command(
+            ["cat", "<", ">", "file.txt"]
+        )
+
 
 @pytest.mark.asyncio
 async def test_io_handle_close(
@@ -929,8 +1039,8 @@ async def test_io_handle_close(
     # Patch the open function to return our mock
     mocker.patch("builtins.open", return_value=mock_file)
 
-    # Mock logging.warning to capture the warning
-    mock_warning = mocker.patch("logging.warning")
+    # Mock the module logger to capture the warning
+    mock_warning = mocker.patch("mcp_shell_server.shell_executor.logger.warning")
 
     # Execute should not raise an error
     await shell_executor_with_mock.execute(
@@ -940,7 +1050,36 @@ async def test_io_handle_close(
     # Verify our mock's close method was called
     assert mock_file.close.called
     # Verify warning was logged
-    mock_warning.assert_called_once_with("Error closing stdout: Failed to close file")
+    mock_warning.assert_called_once()
+    assert mock_warning.call_args.args[:2] == ("Error closing %s: %s", "stdout")
+    assert str(mock_warning.call_args.args[2]) == "Failed to close file"
+
+
+@pytest.mark.asyncio
+async def test_redirected_stdout_closed_in_parent_after_spawn(
+    shell_executor_with_mock, mock_process_manager, temp_test_dir, monkeypatch, mocker
+):
+    """Test the parent's copy of a redirected stdout is released before waiting"""
+    clear_env(monkeypatch)
+    monkeypatch.setenv("ALLOW_COMMANDS", "echo")
+    mock_file = mocker.MagicMock(spec=io.IOBase)
+    mocker.patch("builtins.open", return_value=mock_file)
+
+    async def check_closed(*args, **kwargs):
+        assert mock_file.close.called
+        return (None, b"")
+
+    mock_process_manager.execute_with_timeout.side_effect = check_closed
+
+    result = await shell_executor_with_mock.execute(
+        ["echo", "hello", ">", "out.txt"], directory=temp_test_dir
+    )
+
+    assert result["status"] == 0
+    assert result["stdout"] == ""
+    spawn_kwargs = mock_process_manager.create_process.await_args.kwargs
+    assert spawn_kwargs["stdout_handle"] is mock_file
+    mock_file.close.assert_called_once()
 
 
 def test_preprocess_command_pipeline(shell_executor_with_mock):
@@ -1,10 +1,12 @@
 """Edge case tests for the ShellExecutor class to improve coverage."""
 
+import asyncio
 import os
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from mcp_shell_server.command_preprocessor import CleanedCommand
 from mcp_shell_server.shell_executor import ShellExecutor
 
 
@@ -15,15 +17,15 @@ def shell_executor():
     return ShellExecutor(process_manager=mock_process_manager)
 
 
-def test_get_default_shell_fallback_env(shell_executor):
-    """Test _get_default_shell falls back to SHELL environment variable when pwd.getpwuid raises exception."""
+def test_compute_default_shell_fallback_env(shell_executor):
+    """Test _compute_default_shell falls back to SHELL environment variable when pwd.getpwuid raises exception."""
     # Mock pwd.getpwuid to raise KeyError
     with patch(
         "mcp_shell_server.shell_executor.pwd.getpwuid",
         side_effect=KeyError("User not found"),
     ):
         with patch.dict(os.environ, {"SHELL": "/bin/custom_shell"}):
-            result = shell_executor._get_default_shell()
+            result = shell_executor._compute_default_shell()
             assert result == "/bin/custom_shell"
 
     # Test ImportError fallback
@@ -32,7 +34,7 @@ def test_get_default_shell_fallback_env(shell_executor):
         side_effect=ImportError("pwd module not available"),
     ):
         with patch.dict(os.environ, {"SHELL": "/bin/zsh"}):
-            result = shell_executor._get_default_shell()
+            result = shell_executor._compute_default_shell()
             assert result == "/bin/zsh"
 
     # Test fallback to /bin/sh when SHELL env var not set
@@ -41,10 +43,22 @@ def test_get_default_shell_fallback_env(shell_executor):
         side_effect=KeyError("User not found"),
     ):
         with patch.dict(os.environ, {}, clear=True):
-            result = shell_executor._get_default_shell()
+            result = shell_executor._compute_default_shell()
             assert result == "/bin/sh"
 
 
+def test_get_default_shell_is_cached(shell_executor):
+    """Test _get_default_shell looks the shell up once per executor."""
+    with patch(
+        "mcp_shell_server.shell_executor.pwd.getpwuid",
+        return_value=MagicMock(pw_shell="/bin/bash"),
+    ) as getpwuid:
+        assert shell_executor._get_default_shell() == "/bin/bash"
+        assert shell_executor._get_default_shell() == "/bin/bash"
+
+    getpwuid.assert_called_once()
+
+
 @pytest.mark.asyncio
 async def test_pipeline_validation_error_empty_before_pipe(shell_executor):
     """Test pipeline validation error when preprocess returns empty command before pipe."""
@@ -52,7 +66,7 @@ async def test_pipeline_validation_error_empty_before_pipe(shell_executor):
         os.environ, {"ALLOW_COMMANDS": "true"}
     ):  # Set environment to allow commands
         with patch.object(
-            shell_executor, "_validate_directory", return_value=None
+            ShellExecutor, "_validate_directory", return_value=None
         ):  # Mock directory validation
             with patch.object(
                 shell_executor.preprocessor,
@@ -62,40 +76,35 @@ async def test_pipeline_validation_error_empty_before_pipe(shell_executor):
                 with patch.object(
                     shell_executor.preprocessor,
                     "clean_command",
-                    return_value=["echo", "test", "|", "cat"],
+                    return_value=CleanedCommand(
+                        ["echo", "test", "|", "cat"], has_pipe=True
+                    ),
                 ):
                     with patch.object(
-                        shell_executor.preprocessor,
-                        "split_pipe_commands",
+                        shell_executor.validator,
+                        "split_pipeline",
                         return_value=[],
                     ):  # Empty commands list
                         with patch.object(
                             shell_executor.validator,
-                            "validate_pipeline",
+                            "validate_command",
                             return_value=None,
                         ):
-                            with patch.object(
-                                shell_executor.validator,
-                                "validate_command",
-                                return_value=None,
-                            ):
 
-                                # Execute command with pipe
-                                result = await shell_executor.execute(
-                                    command=["echo", "test", "|", "cat"],
-                                    directory="/tmp",
-                                )
+                            # Execute command with pipe
+                            result = await shell_executor.execute(
+                                command=["echo", "test", "|", "cat"],
+                                directory="/tmp",
+                            )
 
-                                # Verify error response for empty command before pipe
-                                assert (
-                                    result["error"]
-                                    == "Empty command before pipe operator"
-                                )
-                                assert result["status"] == 1
-                                assert (
-                                    result["stderr"]
-                                    == "Empty command before pipe operator"
-                                )
+                            # Verify error response for empty command before pipe
+                            assert (
+                                result["error"] == "Empty command before pipe operator"
+                            )
+                            assert result["status"] == 1
+                            assert (
+                                result["stderr"] == "Empty command before pipe operator"
+                            )
 
 
 @pytest.mark.asyncio
@@ -110,7 +119,7 @@ async def test_invalid_shell_operator_token(shell_executor):
             with patch.object(
                 shell_executor.preprocessor,
                 "clean_command",
-                return_value=["echo", "test", "&&", "echo", "more"],
+                return_value=CleanedCommand(["echo", "test", "&&", "echo", "more"]),
             ):
                 with patch.object(
                     shell_executor.validator,
@@ -141,7 +150,7 @@ async def test_parse_command_error_propagation(shell_executor):
             with patch.object(
                 shell_executor.preprocessor,
                 "clean_command",
-                return_value=["invalid", "command"],
+                return_value=CleanedCommand(["invalid", "command"], has_redirect=True),
             ):
                 with patch.object(
                     shell_executor.validator,
@@ -168,50 +177,38 @@ async def test_parse_command_error_propagation(shell_executor):
 
 @pytest.mark.asyncio
 async def test_io_redirection_processing_error(shell_executor):
-    """Test that exceptions from io_handler.process_redirections are handled and return error dict."""
+    """Test that redirection parse errors are handled and return error dict."""
     with patch.dict(os.environ, {"ALLOW_COMMANDS": "true"}):
         with patch.object(
             shell_executor.preprocessor,
-            "preprocess_command",
-            return_value=["echo", "test"],
+            "clean_command",
+            return_value=CleanedCommand(
+                ["echo", "test", ">", "invalid"], has_redirect=True
+            ),
         ):
             with patch.object(
                 shell_executor.preprocessor,
-                "clean_command",
-                return_value=["echo", "test"],
+                "parse_command",
+                side_effect=ValueError("Invalid redirection syntax"),
             ):
                 with patch.object(
-                    shell_executor.validator,
-                    "validate_no_shell_operators",
-                    return_value=None,
-                ):
-                    with patch.object(
-                        shell_executor.preprocessor,
-                        "parse_command",
-                        return_value=(["echo", "test"], {}),
-                    ):
-                        with patch.object(
-                            shell_executor.validator,
-                            "validate_command",
-                            return_value=None,
-                        ):
-                            with patch.object(
-                                shell_executor.io_handler,
-                                "process_redirections",
-                                side_effect=ValueError("Invalid redirection syntax"),
-                            ):
+                    shell_executor.io_handler, "process_redirections"
+                ) as process_redirections:
+
+                    # Execute command
+                    result = await shell_executor.execute(
+                        command=["echo", "test", ">", "invalid"],
+                        directory="/tmp",
+                    )
 
-                                # Execute command
-                                result = await shell_executor.execute(
-                                    command=["echo", "test", ">", "invalid"],
-                                    directory="/tmp",
-                                )
+                    # Redirections are parsed once, by the preprocessor
+                    process_redirections.assert_not_called()
 
-                                # Verify error dict is returned
-                                assert result["error"] == "Invalid redirection syntax"
-                                assert result["status"] == 1
-                                assert result["stderr"] == "Invalid redirection syntax"
-                                assert "execution_time" in result
+                    # Verify error dict is returned
+                    assert result["error"] == "Invalid redirection syntax"
+                    assert result["status"] == 1
+                    assert result["stderr"] == "Invalid redirection syntax"
+                    assert "execution_time" in result
 
 
 @pytest.mark.asyncio
@@ -233,7 +230,7 @@ async def test_setup_redirects_stdout_as_int(shell_executor):
             with patch.object(
                 shell_executor.preprocessor,
                 "clean_command",
-                return_value=["echo", "test"],
+                return_value=CleanedCommand(["echo", "test"], has_redirect=True),
             ):
                 with patch.object(
                     shell_executor.validator,
@@ -258,7 +255,10 @@ async def test_setup_redirects_stdout_as_int(shell_executor):
                                 with patch.object(
                                     shell_executor.io_handler,
                                     "setup_redirects",
-                                    return_value={"stdout": 1, "stdin_data": None},
+                                    return_value={
+                                        "stdout": 1,
+                                        "stderr": asyncio.subprocess.PIPE,
+                                    },
                                 ):
                                     with patch.object(
                                         shell_executor.process_manager,
@@ -57,6 +57,7 @@ async def test_shell_operator_validation():
             executor._validate_no_shell_operators(op)
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_process_execution_timeout(monkeypatch, temp_test_dir):
     """Test process execution timeout handling"""
@@ -69,6 +70,7 @@ async def test_process_execution_timeout(monkeypatch, temp_test_dir):
         await asyncio.wait_for(executor.execute(command, temp_test_dir), timeout=0.1)
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_process_failure(monkeypatch, temp_test_dir):
     """Test handling of process execution failure"""
@@ -96,3 +98,15 @@ async def test_directory_validation():
     # Test non-existent directory
     with pytest.raises(ValueError, match="Directory does not exist"):
         executor._validate_directory("/nonexistent/directory")
+
+
+def test_executors_share_stateless_collaborators(mock_process_manager):
+    """Test that executors reuse stateless helpers but keep their process manager"""
+    first = ShellExecutor(process_manager=mock_process_manager)
+    second = ShellExecutor()
+
+    assert first.validator is second.validator
+    assert first.directory_manager is second.directory_manager
+    assert first.io_handler is second.io_handler
+    assert first.preprocessor is second.preprocessor
+    assert first.process_manager is not second.process_manager
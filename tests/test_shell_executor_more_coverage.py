@@ -50,7 +50,7 @@ async def test_private_validate_command_and_pipeline_ok(monkeypatch):
 
 @pytest.mark.asyncio
 async def test_execute_timeout_with_stdout_handle_closed(monkeypatch, temp_test_dir):
-    """Test execute method with timeout that closes stdout handle (covers lines 294, 300)."""
+    """Test execute method with timeout that closes stdout handle (covers line 300)."""
     monkeypatch.setenv("ALLOW_COMMANDS", "sleep")
 
     # Create a ShellExecutor with mock process manager
@@ -62,18 +62,11 @@ async def test_execute_timeout_with_stdout_handle_closed(monkeypatch, temp_test_
     with patch.object(
         executor.io_handler,
         "setup_redirects",
-        return_value={"stdout": mock_stdout, "stdin_data": None},
+        return_value={"stdout": mock_stdout, "stderr": asyncio.subprocess.PIPE},
     ):
         # Mock process creation
         mock_process = AsyncMock()
         mock_process.returncode = None
-
-        # Mock kill to raise ProcessLookupError to cover line 294
-        async def kill_side_effect():
-            raise ProcessLookupError("Process not found")
-
-        mock_process.kill = AsyncMock(side_effect=kill_side_effect)
-        mock_process.wait = AsyncMock()
         mock_process_manager.create_process = AsyncMock(return_value=mock_process)
 
         # Mock execute_with_timeout to raise TimeoutError
@@ -81,13 +74,9 @@ async def test_execute_timeout_with_stdout_handle_closed(monkeypatch, temp_test_
             side_effect=asyncio.TimeoutError()
         )
 
-        # Mock process_redirections to return simple command
-        with patch.object(
-            executor.io_handler,
-            "process_redirections",
-            return_value=(["sleep", "1"], {}),
-        ):
-            result = await executor.execute(["sleep", "1"], temp_test_dir, timeout=1)
+        result = await executor.execute(
+            ["sleep", "1", ">", "out.txt"], temp_test_dir, timeout=1
+        )
 
         # Should return timeout error
         assert "timed out" in result["error"]
@@ -96,6 +85,9 @@ async def test_execute_timeout_with_stdout_handle_closed(monkeypatch, temp_test_
         # Verify stdout handle close was called (covers line 300)
         assert mock_stdout.close_call_count == 1
 
+        # The still-running process is handed off to the background reaper once
+        mock_process_manager.reap_in_background.assert_called_once_with(mock_process)
+
 
 @pytest.mark.asyncio
 async def test_execute_generic_exception_closes_stdout_handle(
@@ -113,7 +105,7 @@ async def test_execute_generic_exception_closes_stdout_handle(
     with patch.object(
         executor.io_handler,
         "setup_redirects",
-        return_value={"stdout": mock_stdout, "stdin_data": None},
+        return_value={"stdout": mock_stdout, "stderr": asyncio.subprocess.PIPE},
     ):
         # Mock process creation
         mock_process = AsyncMock()
@@ -125,13 +117,7 @@ async def test_execute_generic_exception_closes_stdout_handle(
             side_effect=RuntimeError("Test error")
         )
 
-        # Mock process_redirections to return simple command
-        with patch.object(
-            executor.io_handler,
-            "process_redirections",
-            return_value=(["echo", "test"], {}),
-        ):
-            result = await executor.execute(["echo", "test"], temp_test_dir)
+        result = await executor.execute(["echo", "test", ">", "out.txt"], temp_test_dir)
 
         # Should return error result
         assert "Test error" in result["error"]
@@ -37,25 +37,6 @@ async def test_redirection_validation():
         executor.io_handler.process_redirections(["cat", "<", "input.txt", ">"])
 
 
-@pytest.mark.asyncio
-async def test_directory_validation(monkeypatch):
-    """Test directory validation"""
-    monkeypatch.setenv("ALLOW_COMMANDS", "echo")
-    executor = ShellExecutor()
-
-    # Directory validation is performed in the _validate_directory method
-    with pytest.raises(ValueError, match="Directory is required"):
-        executor.directory_manager.validate_directory(None)
-
-    # Directory is not absolute path
-    with pytest.raises(ValueError, match="Directory must be an absolute path"):
-        executor.directory_manager.validate_directory("relative/path")
-
-    # Directory does not exist
-    with pytest.raises(ValueError, match="Directory does not exist"):
-        executor.directory_manager.validate_directory("/path/does/not/exist")
-
-
 @pytest.mark.asyncio
 async def test_process_timeout(
     shell_executor_with_mock, temp_test_dir, mock_process_manager, monkeypatch
@@ -44,3 +44,18 @@ async def test_invalid_pipe_command(executor, temp_test_dir, monkeypatch):
     )
     assert result["status"] == 1
     assert "Command not allowed: grep" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_pipe_command_binary_output(executor, temp_test_dir, monkeypatch):
+    """Test binary mode returns pipeline output as undecoded bytes"""
+    monkeypatch.setenv("ALLOW_COMMANDS", "cat,head")
+    mock_process_manager = AsyncMock()
+    mock_process_manager.execute_pipeline.return_value = (b"\xff\x00data\n", b"", 0)
+    executor.process_manager = mock_process_manager
+    result = await executor.execute(
+        ["cat", "blob", "|", "head", "-c", "6"], temp_test_dir, binary=True
+    )
+    assert result["status"] == 0
+    assert result["stdout"] == b"\xff\x00data\n"
+    assert result["stderr"] == b""
@@ -108,6 +108,8 @@ def test_split_pipe_commands_ignores_embedded_pipe_characters():
     assert preprocessor.split_pipe_commands(["echo", " | ", "id"]) == [
         ["echo", " | ", "id"]
     ]
+    # Tokens that are not strings are never mistaken for a pipe
+    assert preprocessor.split_pipe_commands(["echo", 1, "id"]) == [["echo", 1, "id"]]
 
 
 @pytest.mark.asyncio
@@ -241,6 +243,7 @@ async def test_awk_embedded_pipe_payload_has_no_file_side_effect(
     assert not os.path.exists(marker)
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_trailing_pipe_argument_has_no_subprocess_side_effect(
     temp_test_dir, monkeypatch
@@ -373,6 +376,7 @@ async def test_pipeline_rejects_metacharacter_injected_command(
     mock_process_manager.execute_pipeline.assert_not_awaited()
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_pipeline_success_real_execution(temp_test_dir, monkeypatch):
     """Normal argv-based pipeline succeeds without shell interpretation."""
@@ -1,5 +1,6 @@
 """Tests for contained IO redirection handling."""
 
+import asyncio
 import os
 from unittest.mock import patch
 
@@ -27,10 +28,31 @@ async def test_file_input_redirection(handler, tmp_path):
     }
     handles = await handler.setup_redirects(redirects, str(tmp_path))
 
-    assert "stdin" in handles
-    assert handles["stdin_data"] == "test content"
+    assert handles["stdin"].read() == b"test content"
     assert isinstance(handles["stdout"], int)
     assert isinstance(handles["stderr"], int)
+    await handler.cleanup_handles(handles)
+    assert handles["stdin"].closed
+
+
+@pytest.mark.asyncio
+async def test_redirect_files_are_opened_off_the_event_loop(handler, tmp_path):
+    """Test that redirection file IO is delegated to a worker thread."""
+    (tmp_path / "input.txt").write_text("test content")
+    redirects = {
+        "stdin": "input.txt",
+        "stdout": "output.txt",
+        "stdout_append": False,
+    }
+    with patch(
+        "mcp_shell_server.io_redirection_handler.asyncio.to_thread",
+        wraps=asyncio.to_thread,
+    ) as to_thread:
+        handles = await handler.setup_redirects(redirects, str(tmp_path))
+
+    assert to_thread.await_count == 2
+    assert handles["stdin"].read() == b"test content"
+    await handler.cleanup_handles(handles)
 
 
 @pytest.mark.asyncio
@@ -58,12 +80,12 @@ async def test_append_mode(handler, tmp_path):
         "stdout_append": True,
     }
     handles = await handler.setup_redirects(redirects, str(tmp_path))
-    assert handles["stdout"].mode == "a"
+    assert handles["stdout"].mode == "ab"
     await handler.cleanup_handles(handles)
 
     redirects["stdout_append"] = False
     handles = await handler.setup_redirects(redirects, str(tmp_path))
-    assert handles["stdout"].mode == "w"
+    assert handles["stdout"].mode == "wb"
     await handler.cleanup_handles(handles)
 
 
@@ -100,6 +122,17 @@ def test_process_redirections(handler):
     assert redirects["stdout"] == "out.txt"
 
 
+def test_strip_redirect_tokens(handler):
+    """Test stripping redirections without collecting their targets."""
+    assert handler.strip_redirect_tokens(["cat", "<", "in.txt", ">", "out.txt"]) == [
+        "cat"
+    ]
+    assert handler.strip_redirect_tokens(["grep", "x"]) == ["grep", "x"]
+
+    with pytest.raises(ValueError, match="Missing path for output redirection"):
+        handler.strip_redirect_tokens(["grep", "x", ">"])
+
+
 @pytest.mark.asyncio
 async def test_setup_errors(handler, tmp_path):
     """Test error cases in redirection setup."""
@@ -206,7 +239,7 @@ async def test_input_redirection_rejects_symlink_escape_before_open(handler, tmp
 
 @pytest.mark.asyncio
 async def test_valid_in_directory_input_redirection_reads_file(handler, tmp_path):
-    """Contained input redirection continues to read in-directory files."""
+    """Contained input redirection continues to open in-directory files."""
     input_file = tmp_path / "input.txt"
     input_file.write_text("contained input", encoding="utf-8")
     redirects = {
@@ -217,9 +250,10 @@ async def test_valid_in_directory_input_redirection_reads_file(handler, tmp_path
 
     handles = await handler.setup_redirects(redirects, str(tmp_path))
 
-    assert handles["stdin_data"] == "contained input"
+    assert handles["stdin"].read() == b"contained input"
     assert isinstance(handles["stdout"], int)
     assert isinstance(handles["stderr"], int)
+    await handler.cleanup_handles(handles)
 
 
 @pytest.mark.asyncio
@@ -268,6 +302,7 @@ async def test_shell_executor_rejects_escaped_output_without_modifying_file(
     assert outside_file.read_text(encoding="utf-8") == "keep me"
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_shell_executor_writes_and_appends_inside_directory(
     tmp_path, monkeypatch
@@ -330,6 +365,7 @@ async def test_symlink_escape_rejected(handler, tmp_path):
         await handler.setup_redirects(redirects, str(tmp_path))
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_shell_executor_redirect_writes_stay_inside_directory(
     tmp_path, monkeypatch
@@ -349,6 +385,7 @@ async def test_shell_executor_redirect_writes_stay_inside_directory(
     assert (tmp_path / "out.txt").read_text() == "hello\nworld\n"
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_handler_omitted_directory_uses_cwd_for_redirection_containment(
     tmp_path, monkeypatch
@@ -373,6 +410,7 @@ async def test_handler_omitted_directory_uses_cwd_for_redirection_containment(
     assert outside_file.read_text(encoding="utf-8") == "keep me"
 
 
+@pytest.mark.xdist_group(name="subprocess")
 @pytest.mark.asyncio
 async def test_handler_relative_directory_uses_effective_dir_for_symlink_containment(
     tmp_path, monkeypatch